@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Benchmark engram's markdown tokenizer against the regex cascade it replaced.
+
+engram_lint.py and weave_candidates.py used to strip code (a fence, then an
+inline-code substitution) and run one regex per token kind over the copy;
+`mdtokens.tokens` walks each note once. This times both on generated notes of
+the requested sizes and, optionally, on every note of a real brain:
+
+    python3 scripts/bench_engram_tokens.py                       # 64 KB and 1 MB notes
+    python3 scripts/bench_engram_tokens.py --sizes 16,256,4096 --repeat 7
+    python3 scripts/bench_engram_tokens.py --brain path/to/brain --out bench.json
+
+Two workloads: `links` (wikilinks + md links, what the lint reads) and `all`
+(plus H1, bold and quoted spans and the code-free prose, what weave reads).
+The tokenizer side of `all` is weave's own mix: links from `tokens`, the rest
+from per-kind findalls over `prose`.
+Generated notes are prose paragraphs with links, bold, quotes and inline code,
+and a share of fenced blocks (`--fenced`); both paths must yield the same tokens
+for them, or the run exits 1. Brain notes are counted in `differing_notes`
+instead: the paths legitimately differ where code sits inside a token (see
+mdtokens.py).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "skills" / "engram" / "scripts"))
+
+from mdtokens import LINKS, prose, tokens  # noqa: E402
+
+# The regex path, as engram_lint.py / weave_candidates.py had it (weave still
+# takes H1, bold and quoted spans this way, from the prose).
+WIKILINK_RE = re.compile(r"(?<!!)\[\[([^\]\n]+?)\]\]")
+MDLINK_RE = re.compile(r"(?<!!)\[[^\]\n]*\]\(([^)\s]+)\)")
+FENCE_RE = re.compile(r"```.*?```", re.DOTALL)
+INLINE_CODE_RE = re.compile(r"`[^`\n]*`")
+H1_RE = re.compile(r"^#\s+(.+?)\s*$", re.MULTILINE)
+BOLD_RE = re.compile(r"\*\*([^*\n]{2,40})\*\*")
+DQUOTE_RE = re.compile(r"[\"“]([^\"“”\n]{2,40})[\"”]")
+
+PARAGRAPH = ("Notes on the **{a} {b}** rollout: see [[{a}-{b}]] and the [runbook](../{b}/{a}.md),"
+             ' the "{b} {a} checklist" and `{a}.{b}()` before the next change.\n\n')
+FENCE = "```python\nfor n in range({n}):\n    print('[[not-a-link]] **not bold**')\n```\n\n"
+WORDS = ("error", "budget", "release", "train", "design", "review", "cache", "index")
+
+
+def regex_links(text: str) -> dict:
+    text = INLINE_CODE_RE.sub("", FENCE_RE.sub("", text))
+    return {"wikilink": WIKILINK_RE.findall(text), "mdlink": MDLINK_RE.findall(text)}
+
+
+def regex_all(text: str) -> dict:
+    text = INLINE_CODE_RE.sub("", FENCE_RE.sub("", text))
+    h1 = H1_RE.search(text)
+    return {"wikilink": WIKILINK_RE.findall(text), "mdlink": MDLINK_RE.findall(text),
+            "h1": [h1.group(1)] if h1 else [], "bold": BOLD_RE.findall(text),
+            "quote": DQUOTE_RE.findall(text), "prose": text}
+
+
+def token_links(text: str) -> dict:
+    out: dict[str, list[str]] = {"wikilink": [], "mdlink": []}
+    for kind, value in tokens(text, LINKS):
+        out[kind].append(value)
+    return out
+
+
+def token_all(text: str) -> dict:
+    out: dict = token_links(text)
+    code_free = prose(text)
+    h1 = H1_RE.search(code_free)
+    out.update({"h1": [h1.group(1)] if h1 else [], "bold": BOLD_RE.findall(code_free),
+                "quote": DQUOTE_RE.findall(code_free), "prose": code_free})
+    return out
+
+
+WORKLOADS = {"links": (regex_links, token_links), "all": (regex_all, token_all)}
+
+
+def generate(kb: int, fenced: float, rng: random.Random) -> str:
+    parts, size = [f"# Synthetic note {kb} KB\n\n"], 0
+    while size < kb * 1024:
+        if rng.random() < fenced:
+            part = FENCE.format(n=rng.randrange(100))
+        else:
+            part = PARAGRAPH.format(a=rng.choice(WORDS), b=rng.choice(WORDS))
+        parts.append(part)
+        size += len(part)
+    return "".join(parts)
+
+
+def best_ms(fn, texts: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def measure(label: str, texts: list[str], repeat: int) -> dict:
+    size = sum(len(t.encode("utf-8")) for t in texts)
+    row: dict = {"corpus": label, "notes": len(texts), "bytes": size}
+    for name, (regex_fn, token_fn) in WORKLOADS.items():
+        differing = sum(regex_fn(text) != token_fn(text) for text in texts)
+        regex_ms = best_ms(regex_fn, texts, repeat)
+        token_ms = best_ms(token_fn, texts, repeat)
+        row[name] = {"regex_ms": round(regex_ms, 2), "tokens_ms": round(token_ms, 2),
+                     "tokens_mb_per_sec": round(size / 1e6 / (token_ms / 1000), 1),
+                     "speedup": round(regex_ms / token_ms, 2), "differing_notes": differing}
+    return row
+
+
+def brain_notes(base: Path) -> list[str]:
+    from note_index import list_notes
+    texts = []
+    for f in list_notes(base):
+        try:
+            texts.append(f.read_text(encoding="utf-8"))
+        except (UnicodeDecodeError, OSError):
+            pass
+    return texts
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="engram markdown tokenizer benchmark")
+    ap.add_argument("--sizes", default="64,1024", help="note sizes in KB (default 64,1024)")
+    ap.add_argument("--fenced", type=float, default=0.2,
+                    help="share of fenced blocks among generated parts (default 0.2)")
+    ap.add_argument("--brain", metavar="DIR", help="also time every note under this base")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per workload; the best is kept")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", metavar="FILE", help="write results here (default: stdout)")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    corpora = [(f"{kb} KB note", [generate(kb, args.fenced, rng)])
+               for kb in (int(s) for s in args.sizes.split(",") if s.strip())]
+    if args.brain:
+        corpora.append((args.brain, brain_notes(Path(args.brain))))
+    rows = [measure(label, texts, args.repeat) for label, texts in corpora]
+    out = {"python": sys.version.split()[0], "results": rows}
+    text = json.dumps(out, indent=2) + "\n"
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    for row in rows:
+        print(f"{row['corpus']}: " + ", ".join(
+            f"{name} {row[name]['regex_ms']} -> {row[name]['tokens_ms']} ms "
+            f"({row[name]['speedup']}x)" for name in WORKLOADS), file=sys.stderr)
+    generated = rows[:len(rows) - bool(args.brain)]
+    if any(row[name]["differing_notes"] for row in generated for name in WORKLOADS):
+        print("bench_engram_tokens: tokenizer and regex path disagree on a generated note",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
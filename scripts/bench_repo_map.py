@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""Benchmark the repo-map scanner on synthetic monorepos.
+
+Generates deterministic corpora (seeded) at the requested sizes, then scans each
+in a fresh child process so peak RSS belongs to that one run:
+
+    python3 scripts/bench_repo_map.py                          # 1k and 10k files
+    python3 scripts/bench_repo_map.py --sizes 1000,10000,100000 --out bench.json
+    python3 scripts/bench_repo_map.py --baseline bench.json    # exit 1 on a regression
+    python3 scripts/bench_repo_map.py --save-baseline bench.json
+
+A corpus is a JS-workspace monorepo of packages, each in one language of the
+mix (`--mix ts=40,py=30,rs=15,go=15`) with its own manifest (package.json,
+pyproject.toml, Cargo.toml, go.mod), nested source dirs, `--fanout` imports per
+file (half within the package, half to other packages of the same language)
+and a share of minified bundles (`--minified`) for the skip guard to catch.
+Corpora are cached under `--corpus` by their parameters and reused.
+
+Each run records wall time per pipeline phase (enumerate, classify, extract,
+fold, result), files/sec, a cold and a warm scan with the per-file cache, the
+same scan with `--no-cache` (a warm run should beat it), and
+the child's peak RSS (`resource`; add `--tracemalloc` for the traced Python
+heap peak of the phases, at a large slowdown). Each size runs `--repeat` times
+(default 3) and every metric keeps its best run. Against a baseline, a metric
+regresses only when it is worse by more than `--tolerance` (relative) AND by
+more than `--noise-ms` (absolute; 5 MB for RSS), so millisecond-scale jitter
+on small corpora does not fail the run.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCANNER = ROOT / "skills" / "repo-map" / "scripts"
+
+EXT = {"ts": ".ts", "py": ".py", "rs": ".rs", "go": ".go"}
+FILES_PER_PACKAGE = 100
+FILES_PER_DIR = 10
+TOLERANCE = 0.15  # relative slowdown that counts as a regression...
+NOISE_MS = 50.0   # ...and only when also this many ms slower (timings are noisy)
+NOISE_RSS_MB = 5.0
+REPEAT = 3        # child runs per size; each metric keeps its best
+# (metric, higher is better)
+COMPARED = (("total_ms", False), ("warm_cache_ms", False), ("no_cache_ms", False),
+            ("peak_rss_mb", False), ("files_per_sec", True))
+
+
+def parse_mix(text: str) -> list[tuple[str, int]]:
+    mix = []
+    for part in text.split(","):
+        lang, _, weight = part.partition("=")
+        lang = lang.strip()
+        if lang not in EXT:
+            raise ValueError(f"unknown language {lang!r} (use {', '.join(EXT)})")
+        mix.append((lang, int(weight or 1)))
+    return mix
+
+
+def _source(lang: str, pkg: int, d: int, f: int, rng: random.Random, fanout: int,
+            peers: list[int], dirs: int) -> str:
+    """One file's text: `fanout` imports, then some filler lines."""
+    lines = []
+    for i in range(fanout):
+        local = i % 2 == 0 or not peers
+        other = pkg if local else rng.choice(peers)
+        od, of = rng.randrange(dirs), rng.randrange(FILES_PER_DIR)
+        if lang == "ts":
+            spec = f"../d{od}/f{of}" if local else f"@bench/p{other}/src/d{od}/f{of}"
+            lines.append(f'import {{ v{i} }} from "{spec}";')
+        elif lang == "py":
+            lines.append(f"from ..d{od} import f{of}" if local
+                         else f"from p{other}.d{od} import f{of}")
+        elif lang == "rs":
+            lines.append(f"use crate::d{od}::f{of};" if local else f"use p{other}::d{od};")
+        else:
+            lines.append(f'import "example.com/bench/p{other}/src/d{od}"')
+    body = {
+        "ts": "export function fn{n}(x: number): number {{ return x + {n}; }}",
+        "py": "def fn{n}(x):\n    return x + {n}",
+        "rs": "pub fn fn{n}(x: i32) -> i32 {{ x + {n} }}",
+        "go": "func Fn{n}(x int) int {{ return x + {n} }}",
+    }[lang]
+    head = "package d{}\n".format(d) if lang == "go" else ""
+    if lang == "go":
+        lines = ["import ("] + ["\t" + ln.split(" ", 1)[1] for ln in lines] + [")"]
+    fill = [body.format(n=n) for n in range(rng.randrange(3, 12))]
+    return head + "\n".join(lines + [""] + fill) + "\n"
+
+
+def _manifest(lang: str, pkg: int) -> tuple[str, str]:
+    name = f"p{pkg}"
+    if lang == "ts":
+        return "package.json", json.dumps({"name": f"@bench/{name}", "version": "0.0.0"})
+    if lang == "py":
+        return "pyproject.toml", f'[project]\nname = "{name}"\n\n[tool.setuptools.packages.find]\nwhere = ["src"]\n'
+    if lang == "rs":
+        return "Cargo.toml", f'[package]\nname = "{name}"\nversion = "0.0.0"\n'
+    return "go.mod", f"module example.com/bench/{name}\n\ngo 1.21\n"
+
+
+def generate(dest: Path, files: int, mix: list[tuple[str, int]], fanout: int,
+             minified: float, seed: int) -> None:
+    """Write a corpus of about `files` source files to `dest`."""
+    rng = random.Random(seed)
+    dest.mkdir(parents=True)
+    (dest / "package.json").write_text(json.dumps({"name": "bench", "private": True,
+                                                   "workspaces": ["packages/*"]}))
+    (dest / "README.md").write_text("# synthetic repo-map benchmark corpus\n")
+    langs = [lang for lang, _ in mix]
+    weights = [w for _, w in mix]
+    n_pkgs = max(1, files // FILES_PER_PACKAGE)
+    by_lang: dict[str, list[int]] = {}
+    written = 0
+    for pkg in range(n_pkgs):
+        lang = rng.choices(langs, weights)[0]
+        peers = by_lang.setdefault(lang, [])[-20:]  # depend on earlier packages only
+        base = dest / "packages" / f"p{pkg}"
+        src = base / "src" / f"p{pkg}" if lang == "py" else base / "src"
+        count = min(FILES_PER_PACKAGE, files - written) if pkg == n_pkgs - 1 else \
+            FILES_PER_PACKAGE
+        dirs = max(1, -(-count // FILES_PER_DIR))
+        name, text = _manifest(lang, pkg)
+        base.mkdir(parents=True)
+        (base / name).write_text(text)
+        for k in range(count):
+            d, f = divmod(k, FILES_PER_DIR)
+            sub = src / f"d{d}"
+            if not sub.is_dir():
+                sub.mkdir(parents=True)
+                if lang == "py":
+                    (sub / "__init__.py").write_text("")
+            if lang == "ts" and rng.random() < minified:
+                path = sub / f"f{f}.min.js"
+                path.write_text("var a=" + "+".join(["1"] * 2000) + ";\n")
+            else:
+                path = sub / f"f{f}{EXT[lang]}"
+                path.write_text(_source(lang, pkg, d, f, rng, fanout, peers, dirs))
+        if lang == "py":
+            (src / "__init__.py").write_text("")
+        by_lang[lang].append(pkg)
+        written += count
+    if shutil.which("git"):  # real repos list through the git index
+        subprocess.run(["git", "init", "-q", str(dest)], check=True)
+        subprocess.run(["git", "-C", str(dest), "add", "-A"], check=True)
+
+
+def corpus(base: Path, files: int, args) -> Path:
+    """The cached corpus for these parameters, generated on first use."""
+    key = f"f{files}-{args.mix.replace('=', '').replace(',', '_')}-o{args.fanout}" \
+          f"-m{args.minified}-s{args.seed}"
+    dest = base / key
+    if not (dest / ".complete").exists():
+        shutil.rmtree(dest, ignore_errors=True)
+        t0 = time.perf_counter()
+        generate(dest, files, parse_mix(args.mix), args.fanout, args.minified, args.seed)
+        (dest / ".complete").write_text("")
+        sys.stderr.write(f"bench: generated {dest} in {time.perf_counter() - t0:.1f}s\n")
+    return dest
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def measure(root: Path, jobs: int, enumerate_with: str, traced: bool) -> dict:
+    """Child side: one instrumented scan of `root`, then a cold and a warm
+    cached scan and an uncached one."""
+    sys.path.insert(0, str(SCANNER))
+    import scan as rm
+
+    if traced:
+        import tracemalloc
+        tracemalloc.start()
+    phases: dict[str, float] = {}
+    clock = time.perf_counter()
+
+    def lap(name: str) -> None:
+        nonlocal clock
+        now = time.perf_counter()
+        phases[name] = round((now - clock) * 1000, 1)
+        clock = now
+
+    guard = (rm.MAX_BYTES, True)
+    enum = {"backend": None, "listed": 0, "ms": 0.0}
+    listed = list(rm.enumerate_files(root, enumerate_with, enum))
+    lap("enumerate")
+    manifests: list = []
+    state = {"files": 0, "truncated": False}
+    sources = list(rm._sources(listed, root, manifests, state, sys.maxsize))
+    lap("classify")
+    records = list(rm._records(root, sources, None, jobs, guard))
+    lap("extract")
+    sk = rm.Skeleton(root)
+    rm.fold(sk, iter(records))
+    lap("fold")
+    result = sk.result(manifests, state["files"], state["truncated"], enum,
+                       {"enabled": False, "hits": 0, "misses": 0})
+    lap("result")
+    traced_peak = None
+    if traced:
+        traced_peak = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 1)
+        tracemalloc.stop()
+    del records
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = Path(tmp) / "scan.sqlite"
+        timings = []
+        for cached in (True, True, False):  # cold (populates the cache), warm, none
+            t0 = time.perf_counter()
+            rm.scan(root, sys.maxsize, rm.ScanCache(cache_file, guard=guard) if cached else None,
+                    jobs, enumerate_with, guard=guard)
+            timings.append(round((time.perf_counter() - t0) * 1000, 1))
+
+    total = sum(phases.values())
+    return {
+        "files": state["files"],
+        "listed": enum["listed"],
+        "backend": enum["backend"],
+        "modules": result["module_count"],
+        "edges": len(result["internal_edges"]),
+        "skipped": result["skipped"]["count"],
+        "phases_ms": phases,
+        "total_ms": round(total, 1),
+        "files_per_sec": round(state["files"] / (total / 1000)) if total else None,
+        "cold_cache_ms": timings[0],
+        "warm_cache_ms": timings[1],
+        "no_cache_ms": timings[2],
+        "peak_rss_mb": _peak_rss_mb(),
+        "traced_peak_mb": traced_peak,
+    }
+
+
+def run(root: Path, args) -> dict:
+    """Parent side: the lowest-total of `--repeat` child runs, with each
+    compared metric replaced by its best over all the runs (best-of-N damps
+    scheduler and cache noise on short timings)."""
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", str(root),
+           "--jobs", str(args.jobs), "--enumerate", args.enumerate]
+    if args.tracemalloc:
+        cmd.append("--tracemalloc")
+    outs = []
+    for _ in range(max(1, args.repeat)):
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip() or "benchmark child failed")
+        outs.append(json.loads(proc.stdout))
+    best = dict(min(outs, key=lambda o: o["total_ms"]))
+    for metric, higher_better in COMPARED:
+        values = [o[metric] for o in outs if o.get(metric) is not None]
+        if values:
+            best[metric] = max(values) if higher_better else min(values)
+    best["repeat"] = len(outs)
+    return best
+
+
+def _beyond_noise(metric: str, size: int, a: float, b: float, noise_ms: float) -> bool:
+    """Whether the change a -> b is bigger than the absolute noise floor: ms
+    for timings (files/sec converted back to the time it implies), MB for RSS."""
+    if metric == "peak_rss_mb":
+        return abs(b - a) > NOISE_RSS_MB
+    if metric == "files_per_sec":
+        return b > 0 and abs(size / b - size / a) * 1000 > noise_ms
+    return abs(b - a) > noise_ms
+
+
+def compare(results: dict, baseline: dict, tolerance: float,
+            noise_ms: float = NOISE_MS) -> list[dict]:
+    """Per size and metric: baseline vs current, flagged when worse by more
+    than `tolerance` and by more than the absolute noise floor."""
+    before = {r["size"]: r for r in baseline.get("runs", [])}
+    rows = []
+    for cur in results["runs"]:
+        old = before.get(cur["size"])
+        if old is None:
+            continue
+        for metric, higher_better in COMPARED:
+            a, b = old.get(metric), cur.get(metric)
+            if not a or b is None:
+                continue
+            ratio = round(b / a, 3)
+            worse = ratio < 1 - tolerance if higher_better else ratio > 1 + tolerance
+            worse = worse and _beyond_noise(metric, cur["size"], a, b, noise_ms)
+            rows.append({"size": cur["size"], "metric": metric, "baseline": a, "current": b,
+                         "ratio": ratio, "regressed": worse})
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="repo-map scanner benchmark")
+    ap.add_argument("--sizes", default="1000,10000",
+                    help="comma-separated corpus sizes in files (default 1000,10000)")
+    ap.add_argument("--mix", default="ts=40,py=30,rs=15,go=15",
+                    help="language weights (ts, py, rs, go)")
+    ap.add_argument("--fanout", type=int, default=6, help="imports per file (default 6)")
+    ap.add_argument("--minified", type=float, default=0.005,
+                    help="share of TS-package files written as minified bundles")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--corpus", default=str(Path(tempfile.gettempdir()) / "repo-map-bench"),
+                    help="where generated corpora are kept and reused")
+    ap.add_argument("--jobs", type=int, default=1)
+    ap.add_argument("--enumerate", choices=("auto", "git", "walk"), default="auto")
+    ap.add_argument("--repeat", type=int, default=REPEAT,
+                    help=f"runs per size; each metric keeps its best (default {REPEAT})")
+    ap.add_argument("--tracemalloc", action="store_true",
+                    help="also record the traced Python heap peak (slow)")
+    ap.add_argument("--out", metavar="FILE", help="write results here (default: stdout)")
+    ap.add_argument("--baseline", metavar="FILE",
+                    help="compare against saved results; exit 1 on a regression")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE,
+                    help=f"relative change that counts as a regression (default {TOLERANCE})")
+    ap.add_argument("--noise-ms", type=float, default=NOISE_MS,
+                    help=f"a slowdown must also exceed this many ms (default {NOISE_MS:g})")
+    ap.add_argument("--save-baseline", metavar="FILE", help="also save the results as a baseline")
+    ap.add_argument("--child", metavar="ROOT", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        out = measure(Path(args.child), args.jobs, args.enumerate, args.tracemalloc)
+        print(json.dumps(out))
+        return 0
+
+    try:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        parse_mix(args.mix)
+    except ValueError as e:
+        print(f"bench: {e}", file=sys.stderr)
+        return 2
+    base = Path(args.corpus)
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"mix": args.mix, "fanout": args.fanout, "minified": args.minified,
+                   "seed": args.seed, "jobs": args.jobs, "enumerate": args.enumerate},
+        "runs": [],
+    }
+    for size in sizes:
+        root = corpus(base, size, args)
+        run_result = run(root, args)
+        results["runs"].append({"size": size, **run_result})
+        sys.stderr.write(f"bench: {size} files: {run_result['total_ms']:.0f} ms, "
+                         f"{run_result['files_per_sec']} files/s, "
+                         f"warm {run_result['warm_cache_ms']:.0f} ms "
+                         f"(no cache {run_result['no_cache_ms']:.0f} ms), "
+                         f"rss {run_result['peak_rss_mb']} MB\n")
+
+    regressed = False
+    if args.baseline:
+        try:
+            baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"bench: cannot read baseline {args.baseline}: {e}", file=sys.stderr)
+            return 2
+        results["comparison"] = compare(results, baseline, args.tolerance, args.noise_ms)
+        regressed = any(row["regressed"] for row in results["comparison"])
+        for row in results["comparison"]:
+            if row["regressed"]:
+                sys.stderr.write(f"bench: REGRESSION {row['size']} files {row['metric']}: "
+                                 f"{row['baseline']} -> {row['current']} (x{row['ratio']})\n")
+
+    text = json.dumps(results, indent=2) + "\n"
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text, encoding="utf-8")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,6 +42,37 @@ Usage (from the target repo root):
     python <skill>/scripts/engram_lint.py --json     # machine JSON (skill parses)
     python <skill>/scripts/engram_lint.py --base .   # force base (root)
     python <skill>/scripts/engram_lint.py --all      # print summary even when clean
+    python <skill>/scripts/engram_lint.py --no-index # re-read every file, ignore the index
+    python <skill>/scripts/engram_lint.py --budget-ms 300  # Stop hook: this session's notes only
+
+Incremental index: each file's outbound links (wikilink names and .md link
+targets outside code, read in one pass by `mdtokens.tokens`) are kept in
+`<base>/.engram/lint-index.json`, keyed by path + mtime + size. A run re-reads
+only new or changed files and recomputes orphans, weak nodes and metrics from
+the stored links, so the report is identical to a full run. Deadline runs
+append what they re-read to `lint-index.log` instead of rewriting the index;
+the next full run (or a hook run with time to spare, once the log is large)
+folds it back in. `.engram/` holds a `.gitignore` of
+`*`, so the index never syncs with the brain; delete it (or pass `--no-index`)
+to start over.
+
+Deadline mode (`--budget-ms N`, what the Stop hook runs): only notes touched in
+the current session are checked — modified since the previous Stop-hook check
+of this brain when the session began (pinned per brain and hook session_id in
+`<base>/.engram/sessions/`) — newest first, until N ms have passed. Every step
+watches the deadline, the listing included: notes are listed and stat-ed in one
+pass, and the index is read only when a touched note needs its inbound side.
+Reported: broken/dangling links FROM those notes, and those notes being orphans
+or weak nodes (inbound computed from the index, with their stored links).
+Network metrics and everything else are deferred to a full run (`--all`);
+`skipped` says what was left unchecked and `overrun_ms` how far past N the run
+went. Leftover budget indexes not-yet-indexed notes, so the orphan check becomes
+possible after a few turns even on a brain that was never linted in full.
+
+Link resolution never touches the disk per link: notes are listed once into a
+`note_index.NoteIndex` (shared with weave_candidates.py), and md links and
+wikilinks resolve against it in memory — case-folded on case-insensitive
+volumes. Only md targets that leave the base are checked on disk.
 
 Exit code is always 0 (non-blocking). Wikilinks may point to future notes
 (Obsidian convention), so problems are reported but never block work.
@@ -50,10 +81,17 @@ Exit code is always 0 (non-blocking). Wikilinks may point to future notes
 from __future__ import annotations
 
 import json
+import os
 import re
 import sys
+import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mdtokens import WIKILINK, tokens  # noqa: E402
+from note_index import NoteIndex, is_excluded, list_notes, stem  # noqa: E402
+
 REPO = Path.cwd()
 PARA_CATEGORIES = ("projects", "areas", "resources", "archives")
 
@@ -69,10 +107,15 @@ ORPHAN_EXEMPT_NAMES = {"README.md", "_index.md", "index.md", "CLAUDE.md", "MEMOR
 #   density metrics. Harmless when absent.
 ORPHAN_EXEMPT_PREFIXES = ("areas/blog/", "archives/")
 
-WIKILINK_RE = re.compile(r"(?<!!)\[\[([^\]\n]+?)\]\]")          # [[target]] / [[target|alias]] (excludes embeds ![[..]])
-MDLINK_RE = re.compile(r"(?<!!)\[[^\]\n]*\]\(([^)\s]+)\)")       # [text](target) (excludes images ![..](..))
-FENCE_RE = re.compile(r"```.*?```", re.DOTALL)                   # fenced code blocks
-INLINE_CODE_RE = re.compile(r"`[^`\n]*`")                        # inline code
+INDEX_DIR = ".engram"
+INDEX_NAME = "lint-index.json"
+INDEX_LOG = "lint-index.log"  # entries appended by hook runs; save_index folds it in
+INDEX_LOG_MAX = 1 << 18      # a hook run with time to spare folds a log this big
+INDEX_VERSION = 2
+SESSION_DIR = "sessions"     # under INDEX_DIR: <session_id>.start + last-stop
+LAST_STOP = "last-stop"
+SESSION_TTL = 7 * 86400      # session markers older than this are pruned
+OVERRUN_SLACK = 0.1          # share of --budget-ms a run may overshoot before it says so
 
 
 def parse_base_arg() -> str | None:
@@ -98,7 +141,6 @@ def resolve_base() -> tuple[Path, str]:
     # workspace registry: an explicit repo->brain assignment wins over local
     # detection (a repo-local brain/ still wins when there is no assignment).
     try:
-        sys.path.insert(0, str(Path(__file__).resolve().parent))
         from workspace import resolve_brain
         r = resolve_brain(str(REPO))
         if r.get("source") == "assignment" and r.get("base"):
@@ -118,13 +160,377 @@ def resolve_base() -> tuple[Path, str]:
     return (REPO / "brain").resolve(), "brain"
 
 
-def strip_code(text: str) -> str:
-    return INLINE_CODE_RE.sub("", FENCE_RE.sub("", text))
+def parse_links(text: str) -> tuple[list[str], list[str]]:
+    """(wikilink names, .md link targets) of one document, outside code.
+    Names lose their |alias and #heading; targets are kept as written (for the
+    broken-link report) but only relative .md links are returned."""
+    names = []
+    targets = []
+    for kind, value in tokens(text):
+        if kind == WIKILINK:
+            name = value.split("|", 1)[0].split("#", 1)[0].strip()
+            if name:
+                names.append(name)
+        elif not value.startswith(("http://", "https://", "mailto:", "#", "tel:")):
+            clean = value.split("#", 1)[0].split("?", 1)[0]
+            if clean and clean.endswith(".md"):
+                targets.append(value)
+    return names, targets
+
+
+def load_index(base: Path) -> dict:
+    """Stored {base-relative path: [mtime_ns, size, names, targets]}, with the
+    appended log applied; empty when missing, unreadable or from another
+    version."""
+    d = base / INDEX_DIR
+    entries: dict = {}
+    try:
+        data = json.loads((d / INDEX_NAME).read_text(encoding="utf-8"))
+        if data.get("version") == INDEX_VERSION and isinstance(data.get("files"), dict):
+            entries = data["files"]
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        with open(d / INDEX_LOG, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue  # a torn append
+                if isinstance(data, dict) and data.get("version") == INDEX_VERSION \
+                        and isinstance(data.get("files"), dict):
+                    entries.update(data["files"])
+    except (OSError, UnicodeDecodeError):
+        pass
+    return entries
+
+
+def engram_dir(base: Path) -> Path:
+    """`<base>/.engram`, created with a `.gitignore` of `*` (raises OSError)."""
+    d = base / INDEX_DIR
+    d.mkdir(exist_ok=True)
+    ignore = d / ".gitignore"
+    if not ignore.exists():
+        ignore.write_text("*\n", encoding="utf-8")
+    return d
+
+
+def save_index(base: Path, entries: dict) -> None:
+    """Write the index atomically (write + rename), so a concurrent run reads
+    either the old or the new one. Best effort: a read-only brain just stays
+    unindexed."""
+    try:
+        d = engram_dir(base)
+        tmp = d / f"{INDEX_NAME}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps({"version": INDEX_VERSION, "files": entries},
+                                  ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, d / INDEX_NAME)
+        (d / INDEX_LOG).unlink(missing_ok=True)  # folded in (a racing append is just re-read later)
+    except OSError:
+        pass
+
+
+def append_index(base: Path, entries: dict) -> None:
+    """Append `entries` to the index as one log line, instead of rewriting the
+    whole index (what a --budget-ms run does). Best effort, as save_index."""
+    try:
+        with open(engram_dir(base) / INDEX_LOG, "a", encoding="utf-8") as log:
+            log.write(json.dumps({"version": INDEX_VERSION, "files": entries},
+                                 ensure_ascii=False, separators=(",", ":")) + "\n")
+    except OSError:
+        pass
+
+
+def collect_links(base: Path, index: NoteIndex, use_index: bool = True
+                  ) -> dict[Path, tuple[list[str], list[str]] | None]:
+    """parse_links for every file (None when unreadable), taken from the index
+    for files whose mtime and size are unchanged; the index is rewritten when
+    anything was re-read or removed, or a hook run left a log to fold in."""
+    stored = load_index(base) if use_index else {}
+    entries: dict[str, list] = {}
+    out: dict[Path, tuple[list[str], list[str]] | None] = {}
+    fresh = 0
+    for f in index.notes:
+        key = index.key(f)
+        try:
+            st = f.stat()
+        except OSError:
+            out[f] = None
+            continue
+        hit = stored.get(key)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            entries[key] = hit
+            out[f] = None if hit[2] is None else (hit[2], hit[3])
+            continue
+        fresh += 1
+        try:
+            links = parse_links(f.read_text(encoding="utf-8"))
+        except (UnicodeDecodeError, OSError):
+            links = None
+        out[f] = links
+        entries[key] = [st.st_mtime_ns, st.st_size, *(links or (None, None))]
+    if use_index and (fresh or len(entries) != len(stored)
+                      or (base / INDEX_DIR / INDEX_LOG).exists()):
+        save_index(base, entries)
+    return out
+
+
+def parse_budget_arg() -> float | None:
+    """--budget-ms N as seconds, or None."""
+    for i, a in enumerate(sys.argv):
+        value = None
+        if a == "--budget-ms" and i + 1 < len(sys.argv):
+            value = sys.argv[i + 1]
+        elif a.startswith("--budget-ms="):
+            value = a.split("=", 1)[1]
+        if value is not None:
+            try:
+                return max(0.0, float(value)) / 1000
+            except ValueError:
+                return None
+    return None
+
+
+def hook_session_id() -> str | None:
+    """session_id from a hook payload on stdin (None when run by hand)."""
+    try:
+        if sys.stdin is None or sys.stdin.isatty():
+            return None
+        data = json.loads(sys.stdin.buffer.read().decode("utf-8") or "{}")
+    except Exception:
+        return None
+    sid = data.get("session_id") if isinstance(data, dict) else None
+    if not isinstance(sid, str):
+        return None
+    return re.sub(r"[^\w-]", "", sid)[:64] or None
+
+
+def _read_stamp(path: Path) -> float | None:
+    try:
+        return float(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def session_start(base: Path, session_id: str | None) -> float:
+    """Notes modified after this (epoch seconds) count as touched this session.
+
+    A hook session's window opens where the previous Stop-hook check of this
+    brain (any session) started, and is pinned in
+    `<base>/.engram/sessions/<session_id>.start`, so later turns keep it and
+    full or --json lints never move it. Each hook run records its own start
+    as `last-stop`; markers older than SESSION_TTL are pruned when a session
+    opens. The very first hook check of a brain only starts the clock (its
+    window opens now). Without a session id (run by hand) the window is the
+    last hook check's, unpinned, or everything (0) before any."""
+    d = base / INDEX_DIR / SESSION_DIR
+    last = _read_stamp(d / LAST_STOP)
+    if not session_id:
+        return last or 0.0
+    since = time.time() if last is None else last
+    marker = d / f"{session_id}.start"
+    pinned = _read_stamp(marker)
+    try:
+        engram_dir(base)
+        d.mkdir(exist_ok=True)
+        if pinned is None:
+            cutoff = time.time() - SESSION_TTL
+            for old in d.glob("*.start"):
+                try:
+                    if old.stat().st_mtime < cutoff:
+                        old.unlink()
+                except OSError:
+                    pass
+            marker.write_text(repr(since), encoding="utf-8")
+        (d / LAST_STOP).write_text(repr(time.time()), encoding="utf-8")
+    except OSError:
+        pass  # a read-only brain: the window is just not pinned
+    return since if pinned is None else pinned
+
+
+def _walk_notes(base: Path, deadline: float) -> tuple[dict[str, os.stat_result], bool]:
+    """{path: stat} of every note `list_notes` would list, in one scandir pass
+    (the stat comes with the listing, no Path is built); (the notes found so
+    far, False) once `deadline` passes."""
+    stats: dict[str, os.stat_result] = {}
+    stack = [str(base)]
+    while stack:
+        if time.perf_counter() > deadline:
+            return stats, False
+        dirs = []
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if not entry.is_symlink() and not is_excluded((entry.name,)):
+                                dirs.append(entry.path)
+                        elif os.path.normcase(entry.name).endswith(".md"):
+                            stats[entry.path] = entry.stat()
+                    except OSError:
+                        pass
+        except OSError:
+            continue
+        stack += reversed(dirs)
+    return stats, True
+
+
+def _note_paths(found: dict[str, os.stat_result], deadline: float) -> list[Path] | None:
+    """The found notes as Paths, for a NoteIndex — None when they, and the
+    index after them (about twice their cost), would not fit before
+    `deadline`."""
+    t = time.perf_counter()
+    files = []
+    for i, p in enumerate(found):
+        if not i % 1024 and time.perf_counter() > deadline:
+            return None
+        files.append(Path(p))
+    now = time.perf_counter()
+    return files if now + 2 * (now - t) <= deadline else None
+
+
+def lint_recent(base: Path, budget_s: float, t0: float, session_id: str | None) -> dict:
+    """The --budget-ms check: problems introduced by notes touched this
+    session, newest first, until `t0 + budget_s` (see the module docstring)."""
+    deadline = t0 + budget_s
+    since = session_start(base, session_id)
+    found, listed = _walk_notes(base, deadline)
+    recent_paths = sorted((p for p, st in found.items() if st.st_mtime > since),
+                          key=lambda p: (-found[p].st_mtime, p)) if listed else []
+    broken: list[tuple[str, str]] = []
+    dangling: list[tuple[str, str]] = []
+    checked: list[Path] = []
+    orphans: list[str] = []
+    weak: list[str] = []
+    candidates: set[Path] = set()
+    inbound_known = False
+
+    # Nothing touched (most turns): no note index, and the stored one is not read.
+    files = _note_paths(found, deadline) if recent_paths else None
+    if files is not None:
+        index = NoteIndex(base, files)
+        notes = list(zip(files, index.keys.values(), found.values()))  # (note, key, stat)
+        stored = load_index(base)
+        changed: dict[str, list] = {}
+
+        def current(key: str, st: os.stat_result) -> bool:
+            hit = stored.get(key)
+            return bool(hit) and hit[0] == st.st_mtime_ns and hit[1] == st.st_size
+
+        def links_of(f: Path, key: str, st: os.stat_result
+                     ) -> tuple[list[str], list[str]] | None:
+            if not current(key, st):
+                try:
+                    links = parse_links(f.read_text(encoding="utf-8"))
+                except (UnicodeDecodeError, OSError):
+                    links = None
+                changed[key] = stored[key] = [st.st_mtime_ns, st.st_size,
+                                              *(links or (None, None))]
+            hit = stored[key]
+            return None if hit[2] is None else (hit[2], hit[3])
+
+        for p in recent_paths:
+            if time.perf_counter() > deadline:
+                break
+            f = Path(p)
+            checked.append(f)
+            links = links_of(f, index.key(f), found[p])
+            if links is None:
+                continue
+            names, md_targets = links
+            for name in names:
+                if not index.wikilink(name):
+                    dangling.append((_display(f), name))
+            for target in md_targets:
+                clean = target.split("#", 1)[0].split("?", 1)[0]
+                if not index.exists(f, clean):
+                    broken.append((_display(f), target))
+
+        # Spare budget indexes the rest, so the inbound side becomes known.
+        stale = [note for note in notes if not current(note[1], note[2])]
+        for n, note in enumerate(stale):
+            if time.perf_counter() > deadline:
+                stale = stale[n:]
+                break
+            links_of(*note)
+        else:
+            stale = []
+
+        candidates = {f for f in checked
+                      if f.name not in ORPHAN_EXEMPT_NAMES
+                      and not any(index.key(f).startswith(p) for p in ORPHAN_EXEMPT_PREFIXES)}
+        inbound_known = bool(candidates) and not stale
+        if inbound_known:
+            # One pass over the stored links of every note. Only links whose
+            # file name could be a candidate's are resolved.
+            hub_in = dict.fromkeys(candidates, 0)
+            content_in = dict(hub_in)
+            cand_stems = {f.stem.casefold() for f in candidates}
+            cand_files = {f.name.casefold() for f in candidates}
+            for i, (src, key, _) in enumerate(notes):
+                if not i % 256 and time.perf_counter() > deadline:
+                    inbound_known = False
+                    break
+                entry = stored[key]
+                if entry[2] is None:
+                    continue
+                hits = [t for name in entry[2] if stem(name).casefold() in cand_stems
+                        for t in index.wikilink(name) if t in hub_in]
+                for target in entry[3]:
+                    clean = target.split("#", 1)[0].split("?", 1)[0]
+                    if clean.replace("\\", "/").rstrip("/").rsplit("/", 1)[-1].casefold() \
+                            in cand_files:
+                        dst = index.resolve(src, clean)
+                        if dst in hub_in:
+                            hits.append(dst)
+                counts = hub_in if src.name in ORPHAN_EXEMPT_NAMES else content_in
+                for dst in hits:
+                    if dst != src:
+                        counts[dst] += 1
+            else:
+                for f in sorted(hub_in, key=index.key):
+                    if not hub_in[f] and not content_in[f]:
+                        orphans.append(_display(f))
+                    elif not content_in[f]:
+                        weak.append(_display(f))
+
+        # What was re-read is appended to the index; the whole index is only
+        # rewritten when the log has grown large and there is time to spare.
+        try:
+            fold = (base / INDEX_DIR / INDEX_LOG).stat().st_size > INDEX_LOG_MAX
+        except OSError:
+            fold = False
+        if fold and time.perf_counter() <= deadline:
+            save_index(base, {key: stored[key] for _, key, _ in notes if key in stored})
+        elif changed:
+            append_index(base, changed)
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    return {
+        "scope": "session",
+        "scanned": len(found),
+        "checked": len(checked),
+        "broken_md_links": [{"source": s, "target": t} for s, t in sorted(broken)],
+        "dangling_wikilinks": [{"source": s, "name": n} for s, n in sorted(dangling)],
+        "orphans": sorted(orphans),
+        "weak_nodes": sorted(weak),
+        "skipped": {
+            "discovery": not listed,
+            "recent_unchecked": len(recent_paths) - len(checked),
+            "outside_session": len(found) - len(recent_paths) if listed else 0,
+            "inbound_check": not inbound_known and bool(candidates),
+        },
+        "budget_ms": round(budget_s * 1000, 1),
+        "elapsed_ms": round(elapsed_ms, 1),
+        "overrun_ms": round(max(0.0, elapsed_ms - budget_s * 1000), 1),
+    }
 
 
-def is_excluded(parts: tuple[str, ...]) -> bool:
-    """Exclude hidden directories and node_modules."""
-    return any(p == "node_modules" or (p.startswith(".") and len(p) > 1) for p in parts)
+def _display(p: Path) -> str:
+    try:
+        return p.relative_to(REPO).as_posix()
+    except ValueError:
+        return p.as_posix()
 
 
 def main() -> int:
@@ -135,6 +541,9 @@ def main() -> int:
 
     as_json = "--json" in sys.argv
     show_all = "--all" in sys.argv
+    use_index = "--no-index" not in sys.argv
+    budget_s = None if show_all or not use_index else parse_budget_arg()
+    t0 = time.perf_counter()
 
     base, base_label = resolve_base()
 
@@ -153,14 +562,13 @@ def main() -> int:
         except ValueError:
             return p.as_posix()
 
-    def rel_base(p: Path) -> str:
-        return p.relative_to(base).as_posix()
+    if budget_s is not None:
+        return report_recent({"base": base_label,
+                              **lint_recent(base, budget_s, t0, hook_session_id())},
+                             as_json)
 
-    files = [p for p in base.rglob("*.md") if not is_excluded(p.relative_to(base).parts)]
-
-    by_stem: dict[str, list[Path]] = {}
-    for f in files:
-        by_stem.setdefault(f.stem, []).append(f)
+    index = NoteIndex(base, list_notes(base))
+    files = index.notes
 
     def is_hub(p: Path) -> bool:
         """A MOC/structural file — gives links but the orphan concept does not
@@ -173,7 +581,7 @@ def main() -> int:
         PARA category (e.g. areas/) often holds many unrelated topics; a link from
         areas/management to areas/meeting-logs is genuinely cross-context and must
         not count as same-folder just because both sit under areas/."""
-        return p.relative_to(base).parent.as_posix()
+        return index.folder(p)
 
     # Split inbound by source type: links from a hub (README/index) replicate the
     # folder tree (a spoke); links from a content doc are what actually weave the
@@ -184,11 +592,11 @@ def main() -> int:
     dangling_wiki: list[tuple[str, str]] = []
     total_edges = hub_edges = cross_folder_edges = 0
 
+    links = collect_links(base, index, use_index)
     for src in files:
-        try:
-            text = strip_code(src.read_text(encoding="utf-8"))
-        except (UnicodeDecodeError, OSError):
+        if links[src] is None:
             continue
+        names, md_targets = links[src]
 
         src_is_hub = is_hub(src)
         src_folder = folder_key(src)
@@ -206,11 +614,8 @@ def main() -> int:
             if src_folder != folder_key(dst):
                 cross_folder_edges += 1
 
-        for raw in WIKILINK_RE.findall(text):
-            name = raw.split("|", 1)[0].split("#", 1)[0].strip()
-            if not name:
-                continue
-            targets = by_stem.get(Path(name).stem, [])
+        for name in names:
+            targets = index.wikilink(name)
             real_targets = [t for t in targets if t != src]
             if real_targets:
                 for t in real_targets:
@@ -218,17 +623,13 @@ def main() -> int:
             elif not targets:
                 dangling_wiki.append((rel(src), name))
 
-        for target in MDLINK_RE.findall(text):
-            if target.startswith(("http://", "https://", "mailto:", "#", "tel:")):
-                continue
+        for target in md_targets:
             clean = target.split("#", 1)[0].split("?", 1)[0]
-            if not clean or not clean.endswith(".md"):
-                continue
-            resolved = (src.parent / clean).resolve()
-            if resolved.exists():
-                if resolved != src and resolved in inbound_hub:
+            resolved = index.resolve(src, clean)
+            if resolved is not None:
+                if resolved != src:
                     record(resolved)
-            else:
+            elif not index.exists(src, clean):
                 broken_md.append((rel(src), target))
 
     inbound = {f: inbound_hub[f] + inbound_content[f] for f in files}
@@ -236,7 +637,7 @@ def main() -> int:
     def is_exempt(f: Path) -> bool:
         if f.name in ORPHAN_EXEMPT_NAMES:
             return True
-        rb = rel_base(f)
+        rb = index.key(f)
         return any(rb.startswith(p) for p in ORPHAN_EXEMPT_PREFIXES)
 
     orphans: list[str] = []
@@ -320,5 +721,46 @@ def main() -> int:
     return 0
 
 
+def report_recent(result: dict, as_json: bool) -> int:
+    """Print a --budget-ms result: JSON, or a human report that stays silent
+    when the session's notes are clean, nothing was left unchecked and the run
+    kept (within OVERRUN_SLACK of) its budget."""
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    broken, orphans = result["broken_md_links"], result["orphans"]
+    dangling, skipped = result["dangling_wikilinks"], result["skipped"]
+    # dangling wikilinks are listed but, as in the full report, never reason
+    # enough to speak up on their own (they may be planned notes)
+    overrun = result["overrun_ms"] > result["budget_ms"] * OVERRUN_SLACK
+    if not (broken or orphans or skipped["recent_unchecked"] or skipped["discovery"]
+            or overrun):
+        return 0
+    where = "root" if result["base"] == "." else f"{result['base']}/"
+    lines = [f"[engram] integrity check ({result['checked']} note(s) touched this session / {where})"]
+    if broken:
+        lines.append(f"  [X] {len(broken)} broken link(s):")
+        lines += [f"     - {b['source']} -> {b['target']}" for b in broken]
+    if orphans:
+        lines.append(f"  [orphan] {len(orphans)} orphan doc(s) (no inbound link):")
+        lines += [f"     - {o}" for o in orphans]
+    if dangling:
+        lines.append(f"  [!] {len(dangling)} unresolved wikilink(s) (may be a note not created yet):")
+        lines += [f"     - {d['source']} -> [[{d['name']}]]" for d in dangling]
+    if skipped["discovery"]:
+        done = f"notes not all listed ({result['scanned']} found), nothing checked"
+    else:
+        done = (f"{skipped['recent_unchecked']} touched note(s) left unchecked, "
+                f"{skipped['outside_session']} outside the session not checked")
+    lines.append(
+        f"  [budget] {result['elapsed_ms']:.0f} ms"
+        + (f" ({result['overrun_ms']:.0f} ms over {result['budget_ms']:.0f})" if overrun else "")
+        + f": {done}"
+        + ("; orphan check deferred" if skipped["inbound_check"] else "")
+        + " (full check: --all)")
+    print("\n".join(lines))
+    return 0
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""engram markdown tokenizer — one pass over a note for what the scripts read.
+
+engram_lint.py and weave_candidates.py want a note's wikilinks and md links.
+Both used to strip code first (a fence substitution, then an inline-code
+substitution — two full copies of the text) and then run one regex per token
+kind over the copy.
+
+`tokens` walks the original text once instead, with a single combined pattern:
+
+  - code (``` fences, `inline`) is matched and skipped, so nothing inside it
+    is ever a token — no stripped copy is built
+  - every other kind matches only its opening character and reads the rest of
+    the token in a lookahead, so tokens can nest and overlap exactly as the
+    independent per-kind regexes allowed (a [[link]] inside **bold**, a link
+    in the H1); per kind, a match that starts inside the previous token of
+    that kind is dropped, as a non-overlapping findall would
+
+Tokens are the same as the regex path's except where code sits inside one:
+the regex path deleted the code and spliced the text around it, a token here
+keeps the code as written (`# The `foo` module` titles "The `foo` module").
+
+H1, bold and quoted spans are tokens too, but weave takes them with per-kind
+findalls over `prose`: on notes dense in them, the C-level scans beat handing
+each span through Python here.
+
+`prose` is the code-free text itself, for the one caller that searches it
+(weave's mentions, title and emphasis) — one split, instead of two
+substitutions.
+
+Importable: `from mdtokens import tokens, prose`.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Iterator
+
+WIKILINK = "wikilink"  # [[target]] / [[target|alias]], raw inner text (not ![[embeds]])
+MDLINK = "mdlink"      # [text](target), the target as written (not ![images](..))
+H1 = "h1"              # text of the first `# ` heading
+BOLD = "bold"          # **span**, 2-40 chars on one line
+QUOTE = "quote"        # "span" / “span”, 2-40 chars on one line
+
+LINKS = frozenset((WIKILINK, MDLINK))
+ALL = frozenset((WIKILINK, MDLINK, H1, BOLD, QUOTE))
+
+CODE_RE = re.compile(r"```.*?```|`[^`\n]*`", re.DOTALL)
+
+# Every match consumes one character from a fixed set — the regex engine skips
+# ahead to the next such character without trying each branch in between —
+# and a lookbehind on that character picks the branch. Code consumes its whole
+# span; every other kind reads its token in a lookahead. No "[" opens both a
+# wikilink and an md link (the first "]" after it would have to be followed by
+# both "]" and "("), so each match is at most one token.
+_CODE = r"(?<=`)(?:``(?s:.*?)```|[^`\n]*`)"
+_BRANCHES = {  # kind: (opening character, branch)
+    WIKILINK: ("[", r"(?<!!\[)(?=\[(?P<wikilink>[^\]\n]+?)\]\])"),
+    MDLINK: ("[", r"(?<!!\[)(?=[^\]\n]*\]\((?P<mdlink>[^)\s]+)\))"),
+    H1: ("#", r"(?<![^\n]#)(?=\s+(?P<h1>.+?)\s*$)"),
+    BOLD: ("*", r"(?=\*(?P<bold>[^*\n]{2,40})\*\*)"),
+    QUOTE: ("\"“", r"(?=(?P<quote>[^\"“”\n]{2,40})[\"”])"),
+}
+# characters after each kind's span (its closer)
+_TAIL = {WIKILINK: 2, MDLINK: 1, H1: 0, BOLD: 2, QUOTE: 1}
+
+
+@lru_cache(maxsize=None)
+def _pattern(kinds: frozenset[str]) -> re.Pattern:
+    chars, branches = "`", [_CODE]
+    for kind, (opener, branch) in _BRANCHES.items():
+        if kind in kinds:
+            chars += opener
+            branches.append(f"(?<=[{re.escape(opener)}]){branch}")
+    return re.compile(f"[{re.escape(chars)}](?:{'|'.join(branches)})", re.MULTILINE)
+
+
+def tokens(text: str, kinds: frozenset[str] = LINKS) -> Iterator[tuple[str, str]]:
+    """(kind, value) for every token of `kinds` outside code, in document
+    order. At most one H1 is yielded."""
+    until = dict.fromkeys(_TAIL, 0)  # per kind: where its last token ended
+    for m in _pattern(kinds).finditer(text):
+        kind = m.lastgroup
+        if kind is None or m.start() < until[kind]:
+            continue
+        until[kind] = len(text) + 1 if kind == H1 else m.end(kind) + _TAIL[kind]
+        yield kind, m.group(kind)
+
+
+def prose(text: str) -> str:
+    """`text` with fenced and inline code removed."""
+    return "".join(CODE_RE.split(text))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""engram note index — every note under a PARA base, for syscall-free linking.
+
+engram_lint.py and weave_candidates.py both resolve tens of thousands of links
+per run. Instead of `(src.parent / target).resolve()` + `.exists()` per link,
+the notes are listed once (one directory walk) into an in-memory index, and
+links resolve lexically against it:
+
+  - md link  `[t](../x/note.md)` -> join with the source's folder, normalize
+    `.`/`..` as strings, look the base-relative path up in a dict
+  - wikilink `[[note]]`          -> look the stem up in a dict of stem -> notes
+
+On a case-insensitive volume (Windows, default macOS) paths and stems are
+compared case-folded, as the filesystem would; whether the base's volume is
+one is probed once, when the index is built. The only filesystem work left is
+for md links that leave the base or point into an excluded dir (.git,
+node_modules, ...): those are not notes, so their existence is checked on disk.
+
+Importable: `from note_index import NoteIndex, list_notes, is_excluded`.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import posixpath
+import sys
+from pathlib import Path
+
+
+def is_excluded(parts: tuple[str, ...]) -> bool:
+    """Exclude hidden directories and node_modules."""
+    return any(p == "node_modules" or (p.startswith(".") and len(p) > 1) for p in parts)
+
+
+def list_notes(base: Path) -> list[Path]:
+    """Every *.md file under `base`, without descending into excluded dirs
+    (a brain's .git alone can hold more entries than its notes)."""
+    out = []
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames[:] = [d for d in dirnames if not is_excluded((d,))]
+        out += [Path(dirpath, n) for n in filenames if fnmatch.fnmatch(n, "*.md")]
+    return out
+
+
+def case_insensitive_volume(base: Path) -> bool:
+    """Whether `base` sits on a case-insensitive filesystem: its own name with
+    the case swapped names the same directory. Platform default when the name
+    has no cased letters."""
+    swapped = base.name.swapcase()
+    if swapped == base.name:
+        return sys.platform in ("win32", "darwin")
+    try:
+        return os.path.samefile(base, base.with_name(swapped))
+    except OSError:
+        return False
+
+
+def stem(name: str) -> str:
+    """`Path(name).stem` without building a Path."""
+    if os.sep == "\\":
+        name = name.replace("\\", "/")
+    name = name.rstrip("/")
+    tail = name.rsplit("/", 1)[-1]
+    dot = tail.rfind(".")
+    return tail[:dot] if 0 < dot < len(tail) - 1 else tail
+
+
+class NoteIndex:
+    """The notes under `base` (from `list_notes` unless given), keyed by
+    base-relative posix path and by stem."""
+
+    def __init__(self, base: Path, notes: list[Path] | None = None,
+                 case_insensitive: bool | None = None):
+        self.base = base
+        self.notes = list_notes(base) if notes is None else notes
+        self.fold = case_insensitive_volume(base) if case_insensitive is None \
+            else case_insensitive
+        cut = len(str(base)) + 1  # every listed path starts with base
+        self.keys: dict[Path, str] = {p: str(p)[cut:].replace(os.sep, "/") for p in self.notes}
+        self.by_key: dict[str, Path] = {}
+        self.by_stem: dict[str, list[Path]] = {}
+        for p, key in self.keys.items():
+            self.by_key.setdefault(self._norm(key), p)
+            self.by_stem.setdefault(self._norm(p.stem), []).append(p)
+
+    def _norm(self, s: str) -> str:
+        return s.casefold() if self.fold else s
+
+    def key(self, note: Path) -> str:
+        """Base-relative posix path of a listed note."""
+        return self.keys[note]
+
+    def folder(self, note: Path) -> str:
+        """The note's parent dir relative to base ("." at the base itself)."""
+        return posixpath.dirname(self.keys[note]) or "."
+
+    def wikilink(self, name: str) -> list[Path]:
+        """Notes a `[[name]]` wikilink (alias/heading already removed) names."""
+        return self.by_stem.get(self._norm(stem(name)), [])
+
+    def _join(self, src: Path, target: str) -> str:
+        """`target` relative to `src`'s folder, normalized, base-relative."""
+        if os.sep == "\\":
+            target = target.replace("\\", "/")
+        return posixpath.normpath(posixpath.join(posixpath.dirname(self.keys[src]), target))
+
+    def resolve(self, src: Path, target: str) -> Path | None:
+        """The note an md link `target` (query/fragment already removed) in
+        note `src` points to; None when it points to no note."""
+        return self.by_key.get(self._norm(self._join(src, target)))
+
+    def exists(self, src: Path, target: str) -> bool:
+        """Whether an md link target exists: a note, or — only for targets
+        outside the listed notes' reach — a file on disk."""
+        joined = self._join(src, target)
+        if self._norm(joined) in self.by_key:
+            return True
+        if not (joined.startswith("../") or joined == ".." or target.startswith("/")
+                or is_excluded(tuple(joined.split("/")[:-1]))):
+            return False  # inside the base, and not a listed note
+        return (src.parent / target).resolve().exists()
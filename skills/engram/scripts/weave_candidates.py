@@ -37,14 +37,17 @@ import sys
 from collections import defaultdict
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mdtokens import WIKILINK, prose, tokens  # noqa: E402
+from note_index import NoteIndex  # noqa: E402
+
 REPO = Path.cwd()
 PARA_CATEGORIES = ("projects", "areas", "resources", "archives")
 HUB_NAMES = {"README.md", "_index.md", "index.md", "CLAUDE.md", "MEMORY.md"}
 
-WIKILINK_RE = re.compile(r"(?<!!)\[\[([^\]\n]+?)\]\]")
-MDLINK_RE = re.compile(r"(?<!!)\[[^\]\n]*\]\(([^)\s]+)\)")
-FENCE_RE = re.compile(r"```.*?```", re.DOTALL)
-INLINE_CODE_RE = re.compile(r"`[^`\n]*`")
+# Title and emphasis come from per-kind scans of the prose: on token-dense
+# notes these C-level findalls beat handing every span through the tokenizer.
 H1_RE = re.compile(r"^#\s+(.+?)\s*$", re.MULTILINE)
 BOLD_RE = re.compile(r"\*\*([^*\n]{2,40})\*\*")
 DQUOTE_RE = re.compile(r"[\"“]([^\"“”\n]{2,40})[\"”]")
@@ -76,14 +79,6 @@ def resolve_base() -> tuple[Path, str]:
     return (REPO / "brain").resolve(), "brain"
 
 
-def strip_code(text: str) -> str:
-    return INLINE_CODE_RE.sub("", FENCE_RE.sub("", text))
-
-
-def is_excluded(parts: tuple[str, ...]) -> bool:
-    return any(p == "node_modules" or (p.startswith(".") and len(p) > 1) for p in parts)
-
-
 def is_specific(phrase: str) -> bool:
     """Keep only anchors specific enough to avoid false matches: multi-word, or a
     non-ASCII (e.g. Korean) term. Single common English words are too noisy."""
@@ -111,7 +106,8 @@ def main() -> int:
               else f"[engram] base '{base_label}' not found.")
         return 0
 
-    files = [p for p in base.rglob("*.md") if not is_excluded(p.relative_to(base).parts)]
+    index = NoteIndex(base)
+    files = index.notes
 
     def rel(p: Path) -> str:
         try:
@@ -123,13 +119,10 @@ def main() -> int:
         # immediate parent dir relative to base = the "topic folder". Cross-folder
         # is judged here, not at the PARA top, so a concept recurring across
         # areas/management and areas/meeting-logs counts as genuinely cross-topic.
-        return p.relative_to(base).parent.as_posix()
-
-    by_stem: dict[str, list[Path]] = {}
-    for f in files:
-        by_stem.setdefault(f.stem, []).append(f)
+        return index.folder(p)
 
-    texts: dict[Path, str] = {}
+    texts: dict[Path, str] = {}            # note -> its prose (code removed)
+    emphasized: dict[Path, list[str]] = {}  # note -> its bold and quoted spans
     anchors: dict[Path, set[str]] = {}     # note -> phrases that should link to it
     outbound: dict[Path, set[Path]] = defaultdict(set)
     inbound_content: dict[Path, int] = {f: 0 for f in files}
@@ -140,8 +133,8 @@ def main() -> int:
             raw = f.read_text(encoding="utf-8")
         except (UnicodeDecodeError, OSError):
             raw = ""
-        text = strip_code(raw)
-        texts[f] = text
+        text = texts[f] = prose(raw)
+        emphasized[f] = BOLD_RE.findall(text) + DQUOTE_RE.findall(text)
 
         anchor_set: set[str] = set()
         stem_phrase = f.stem.replace("-", " ").strip()
@@ -157,19 +150,18 @@ def main() -> int:
         if f.name not in HUB_NAMES:
             anchors[f] = anchor_set
 
-        # outbound links (resolved paths + wikilink stems)
-        for stem in (s.split("|", 1)[0].split("#", 1)[0].strip() for s in WIKILINK_RE.findall(text)):
-            for t in by_stem.get(Path(stem).stem, []):
-                if t != f:
-                    outbound[f].add(t)
-        for tgt in MDLINK_RE.findall(text):
-            if tgt.startswith(("http://", "https://", "mailto:", "#", "tel:")):
-                continue
-            clean = tgt.split("#", 1)[0].split("?", 1)[0]
-            if clean.endswith(".md"):
-                resolved = (f.parent / clean).resolve()
-                if resolved.exists() and resolved != f:
-                    outbound[f].add(resolved)
+        # outbound links (resolved paths + wikilink stems), in one pass
+        for kind, value in tokens(raw):
+            if kind == WIKILINK:
+                for t in index.wikilink(value.split("|", 1)[0].split("#", 1)[0].strip()):
+                    if t != f:
+                        outbound[f].add(t)
+            elif not value.startswith(("http://", "https://", "mailto:", "#", "tel:")):
+                clean = value.split("#", 1)[0].split("?", 1)[0]
+                if clean.endswith(".md"):
+                    resolved = index.resolve(f, clean)
+                    if resolved is not None and resolved != f:
+                        outbound[f].add(resolved)
 
     # contextual inbound (links FROM a non-hub doc) -> spoke detection
     for src, dsts in outbound.items():
@@ -205,8 +197,8 @@ def main() -> int:
 
     # 2. concept candidates: bold/quoted terms recurring across >=2 folders, no node
     term_docs: dict[str, set[Path]] = defaultdict(set)
-    for f, text in texts.items():
-        for m in BOLD_RE.findall(text) + DQUOTE_RE.findall(text):
+    for f, spans in emphasized.items():
+        for m in spans:
             term = FORMAT_STRIP_RE.sub("", m).strip()
             if is_specific(term) and term.lower() not in existing_node_terms:
                 term_docs[term].add(f)
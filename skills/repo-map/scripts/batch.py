@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""repo-map batch mode — scan many repositories in one process.
+
+`scan.py --workspace <brain>` scans every repo the engram workspace registry
+assigns to that brain (absorb or hybrid); `--roots-from FILE` takes one root per
+line instead (`-` = stdin, `#` comments). All repos share one process — the
+compiled import regexes, and with --jobs N one extraction worker pool — so
+mapping 150 repos costs one interpreter start, not 150.
+
+On top of the per-repo skeletons it emits a cross-repo edge layer: repo A ->
+repo B when a dependency A's manifests declare is a package B publishes
+(package.json / Cargo.toml / pyproject.toml name, go.mod module path).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import scan as rm  # noqa: E402
+
+# repo-map and engram ship in the same plugin, side by side under skills/.
+ENGRAM_SCRIPTS = Path(__file__).resolve().parents[2] / "engram" / "scripts"
+
+
+class BatchError(Exception):
+    """The list of roots could not be determined."""
+
+
+def workspace_roots(brain: str) -> list[Path]:
+    """Repo roots assigned to `brain` in the engram workspace registry."""
+    sys.path.insert(0, str(ENGRAM_SCRIPTS))
+    try:
+        import workspace
+    except ImportError:
+        raise BatchError("--workspace needs the engram skill next to repo-map") from None
+    cfg = workspace.load_config()
+    if brain not in cfg["brains"]:
+        known = ", ".join(sorted(cfg["brains"])) or "none registered"
+        raise BatchError(f"unknown brain {brain!r} (known: {known})")
+    return [Path(stored) for stored, val in sorted(cfg["assignments"].items())
+            if workspace.assignment_parts(val)[0] == brain]
+
+
+def roots_from(source: str) -> list[Path]:
+    """Roots listed one per line in file `source` ("-" = stdin)."""
+    try:
+        text = sys.stdin.read() if source == "-" else Path(source).read_text(encoding="utf-8")
+    except OSError as e:
+        raise BatchError(f"cannot read {source}: {e}") from None
+    return [Path(line.strip()).expanduser() for line in text.splitlines()
+            if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _norm(name: str) -> str:
+    """Registry-agnostic package key: case and -/_/. separators folded."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def published(root: Path, manifests: list[tuple[Path, str]]) -> dict[str, tuple[str, str]]:
+    """Normalized package name -> (name, module key) for every package the
+    repo's manifests publish, root manifests included."""
+    out: dict[str, tuple[str, str]] = {}
+    for path, name in manifests:
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            continue
+        found = None
+        if name == "package.json":
+            try:
+                found = json.loads(text).get("name")
+            except Exception:
+                pass
+        elif name == "Cargo.toml":
+            m = re.search(r'(?ms)^\[package\][^\[]*?^\s*name\s*=\s*"([^"]+)"', text)
+            found = m and m.group(1)
+        elif name == "pyproject.toml":
+            m = re.search(r'(?ms)^\[(?:project|tool\.poetry)\][^\[]*?^\s*name\s*=\s*"([^"]+)"',
+                          text)
+            found = m and m.group(1)
+        elif name == "go.mod":
+            m = re.search(r"(?m)^module\s+(\S+)", text)
+            found = m and m.group(1)
+        if isinstance(found, str) and found:
+            out.setdefault(_norm(found), (found, rm.module_key(path.relative_to(root).parts[:-1])))
+    return out
+
+
+def _labels(roots: list[Path]) -> list[str]:
+    """Directory names, or the full path where two repos share a name."""
+    names = [r.name or str(r) for r in roots]
+    return [n if names.count(n) == 1 else r.as_posix() for n, r in zip(names, roots)]
+
+
+def scan_roots(roots: list[Path], max_files: int, jobs: int = 1, enumerate_with: str = "auto",
+               guard: tuple[int, bool] = (rm.MAX_BYTES, True), cache: bool = True,
+               rebuild: bool = False, emit: Callable[[dict], None] | None = None) -> dict:
+    """Scan each root (each with its own scan cache) and link them. With `emit`,
+    each repo's skeleton is handed over as soon as it is done instead of being
+    kept in the result."""
+    roots = [Path(os.path.abspath(r)) for r in roots]
+    pool = None
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=jobs)
+    repos, errors = [], []
+    pubs: dict[str, dict[str, tuple[str, str]]] = {}
+    deps: dict[str, list[str]] = {}
+    try:
+        for root, label in zip(roots, _labels(roots)):
+            if not root.is_dir():
+                errors.append({"root": root.as_posix(), "error": "not a directory"})
+                continue
+            manifests: list[tuple[Path, str]] = []
+            sc = rm.ScanCache(rm.cache_path(root), rebuild=rebuild, guard=guard) if cache else None
+            result = rm.scan(root, max_files, sc, jobs, enumerate_with, guard=guard,
+                             pool=pool, manifests=manifests)
+            pubs[label] = published(root, manifests)
+            deps[label] = rm.detect_stack(manifests)[1]
+            record = {"name": label, **result}
+            if emit:
+                emit({"type": "repo", **record})
+            else:
+                repos.append(record)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    owners: dict[str, list[tuple[str, str, str]]] = {}
+    for label, names in pubs.items():
+        for key, (name, mod) in names.items():
+            owners.setdefault(key, []).append((label, name, mod))
+    cross = []
+    for label, declared in deps.items():
+        links: dict[str, list[dict]] = {}
+        for dep in declared:
+            for owner, name, mod in owners.get(_norm(dep), ()):
+                if owner != label:
+                    links.setdefault(owner, []).append({"name": name, "module": mod})
+        cross += [{"from": label, "to": owner, "packages": pkgs}
+                  for owner, pkgs in sorted(links.items())]
+
+    out = {"repo_count": len(pubs), "cross_repo_edges": cross, "errors": errors}
+    return out if emit else {"repos": repos, **out}
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""repo-map daemon — keep a repository's skeleton warm between scans.
+
+`scan.py --serve` runs this: one full scan builds an in-memory `Skeleton` plus
+the per-file records behind it, then a poll thread re-lists the tree every few
+seconds, stats each source file and applies per-file deltas (retract the old
+record, add the re-extracted one) instead of rescanning. Requests are answered
+over a Unix socket (default, next to the scan cache) or a localhost TCP port:
+
+    {"cmd": "scan"}    -> the same JSON skeleton `scan.py --json` prints
+    {"cmd": "status"}  -> files/modules held, polls, last poll time, deltas applied
+    {"cmd": "stop"}    -> shut the daemon down
+
+One JSON line in, one JSON line out. `scan.py --client` asks a running daemon
+and falls back to a one-shot scan when none answers, so callers never block on
+the daemon being up. Stdlib only; polling rather than OS file watchers keeps it
+portable.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import scan as rm  # noqa: E402
+
+POLL_SECONDS = 2.0
+CLIENT_TIMEOUT = 30.0
+
+
+def default_address(root: Path) -> str:
+    """Unix socket path for `root`, beside its scan cache."""
+    return str(rm.cache_path(root).with_suffix(".sock"))
+
+
+class LiveMap:
+    """A `Skeleton` kept current by polling: files -> (stat key, record)."""
+
+    def __init__(self, root: Path, max_files: int, enumerate_with: str,
+                 guard: tuple[int, bool], resolver: rm.RelativeResolver | None = None):
+        self.root = root
+        self.max_files = max_files
+        self.enumerate_with = enumerate_with
+        self.guard = guard
+        self.sk = rm.Skeleton(root, resolver)
+        self.files: dict[str, tuple[tuple, tuple]] = {}
+        self.manifests: list[tuple[Path, str]] = []
+        self.manifest_keys: dict[str, tuple] = {}
+        self.state = {"files": 0, "truncated": False}
+        self.enum = {"backend": None, "listed": 0, "ms": 0.0}
+        self.cache_report = {"enabled": False, "hits": 0, "misses": 0}
+        self.lock = threading.Lock()
+        self.polls = 0
+        self.deltas = 0
+        self.last_poll_ms = 0.0
+        self.started = time.time()
+        self._result: dict | None = None
+
+    @staticmethod
+    def _stat_key(path: Path) -> tuple | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def refresh(self, cache: rm.ScanCache | None = None, jobs: int = 1) -> int:
+        """Re-list and stat the tree, apply deltas for changed files; returns
+        how many files changed. The first call (with `cache`) is the full build."""
+        t0 = time.perf_counter()
+        enum = {"backend": None, "listed": 0, "ms": 0.0}
+        manifests: list[tuple[Path, str]] = []
+        state = {"files": 0, "truncated": False}
+        seen: dict[str, tuple[str, tuple]] = {}
+        listed = rm.enumerate_files(self.root, self.enumerate_with, enum)
+        for rel, lang in rm._sources(listed, self.root, manifests, state, self.max_files):
+            key = self._stat_key(self.root / rel)
+            if key is not None:
+                seen[rel] = (lang, key)
+        manifest_keys = {str(p): self._stat_key(p) for p, _ in manifests}
+
+        stale = [rel for rel, (key, _) in self.files.items()
+                 if rel not in seen or seen[rel][1] != key]
+        fresh = [(rel, lang) for rel, (lang, key) in seen.items()
+                 if rel not in self.files or self.files[rel][0] != key]
+        records = list(rm._records(self.root, fresh, cache, jobs, self.guard)) if fresh else []
+        if cache:
+            cache.close()
+            self.cache_report = cache.report()
+
+        changed = bool(stale or records) or manifest_keys != self.manifest_keys
+        with self.lock:
+            for rel in stale:
+                _, rec = self.files.pop(rel)
+                self.sk.add(rel, *rec, sign=-1)
+            for rel, mod, lang, loc, targets, skip in records:
+                rec = (mod, lang, loc, targets, skip)
+                self.files[rel] = (seen[rel][1], rec)
+                self.sk.add(rel, *rec)
+            self.manifests, self.manifest_keys = manifests, manifest_keys
+            self.state, self.enum = state, enum
+            if changed:
+                self._result = None
+            self.polls += 1
+            self.deltas += len(stale) + len(records)
+            self.last_poll_ms = round((time.perf_counter() - t0) * 1000, 1)
+        return len(set(stale) | {r[0] for r in records})
+
+    def result(self) -> dict:
+        with self.lock:
+            if self._result is None:
+                self._result = self.sk.result(self.manifests, self.state["files"],
+                                              self.state["truncated"], self.enum,
+                                              self.cache_report)
+            return self._result
+
+    def status(self) -> dict:
+        with self.lock:
+            return {"root": str(self.root), "pid": os.getpid(), "files": len(self.files),
+                    "modules": len(self.sk.modules), "polls": self.polls,
+                    "deltas": self.deltas, "last_poll_ms": self.last_poll_ms,
+                    "uptime_s": round(time.time() - self.started, 1)}
+
+
+def _handler(live: LiveMap, stop: threading.Event):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            try:
+                line = self.rfile.readline().decode("utf-8").strip()
+                cmd = json.loads(line).get("cmd") if line.startswith("{") else line
+            except Exception:
+                cmd = None
+            if cmd == "scan":
+                reply = live.result()
+            elif cmd == "status":
+                reply = live.status()
+            elif cmd == "stop":
+                reply = {"stopping": True}
+                stop.set()
+            else:
+                reply = {"error": f"unknown command: {cmd!r}"}
+            payload = json.dumps(reply, ensure_ascii=False) + "\n"
+            self.wfile.write(payload.encode("utf-8"))
+    return Handler
+
+
+def _bind(address: str | int, handler) -> socketserver.BaseServer:
+    if isinstance(address, int):
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        return socketserver.ThreadingTCPServer(("127.0.0.1", address), handler)
+    path = Path(address)
+    if path.exists():
+        if request(address, "status", timeout=1.0) is not None:
+            raise OSError(f"a repo-map daemon is already serving {address}")
+        path.unlink()  # left behind by a daemon that died
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return socketserver.ThreadingUnixStreamServer(str(path), handler)
+
+
+def serve(live: LiveMap, address: str | int, cache: rm.ScanCache | None = None,
+          jobs: int = 1, interval: float = POLL_SECONDS) -> int:
+    """Build the map, then poll and answer requests until stopped."""
+    stop = threading.Event()
+    server = _bind(address, _handler(live, stop))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    try:
+        live.refresh(cache, jobs)  # the address is claimed; requests wait for this
+        thread.start()
+        sys.stderr.write(f"repo-map: serving {live.root} on {address} "
+                         f"({len(live.files)} files, poll {interval}s)\n")
+        while not stop.wait(interval):
+            try:
+                live.refresh()
+            except Exception as e:  # a bad poll must not take the daemon down
+                sys.stderr.write(f"repo-map: poll failed: {e}\n")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if thread.is_alive():  # shutdown() blocks forever unless serve_forever runs
+            server.shutdown()
+        server.server_close()
+        if not isinstance(address, int):
+            try:
+                os.unlink(address)
+            except OSError:
+                pass
+    return 0
+
+
+def request(address: str | int, cmd: str, timeout: float = CLIENT_TIMEOUT) -> dict | None:
+    """Send one command to a daemon; None when no daemon answers."""
+    try:
+        if isinstance(address, int):
+            sock = socket.create_connection(("127.0.0.1", address), timeout=timeout)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(address)
+    except (OSError, AttributeError):  # refused, missing socket, no AF_UNIX
+        return None
+    try:
+        with sock, sock.makefile("rwb") as f:
+            f.write((json.dumps({"cmd": cmd}) + "\n").encode("utf-8"))
+            f.flush()
+            line = f.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
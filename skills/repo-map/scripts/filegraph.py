@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""repo-map file-level import graph — `scan.py --granularity file`.
+
+The module map collapses everything to two directory levels; refactoring work
+needs the file graph underneath. Files get integer ids (their position in the
+sorted listing) and edges live in CSR form — three `array`s: `offsets[i]` ..
+`offsets[i+1]` index the `targets`/`weights` of file i — so 200k files and
+millions of edges cost a few bytes per edge instead of a dict entry each.
+
+The listing is taken first (paths only), which fixes every id and all the
+resolution context bare imports need (manifests, Python packages, tsconfig
+aliases, workspaces). Extraction records then arrive in id order and each
+file's edges are resolved and appended at once; beyond the arrays, only the
+relative resolver's bounded LRU and a memo of distinct bare targets are kept.
+
+Targets resolve to files lexically, against the listing — no filesystem
+probing: a path, the same path with any source extension, or a directory's
+index/__init__/mod file. Python absolute imports try each sys.path root
+(longest dotted prefix first); TS/JS bare imports go through path aliases and
+workspace packages. Rust and Go bare imports name crates/packages, not files,
+and are counted as unresolved.
+"""
+
+from __future__ import annotations
+
+import json
+import posixpath
+import sys
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import scan as rm  # noqa: E402
+
+INDEX_STEMS = ("index", "__init__", "mod")
+
+
+class FileIndex:
+    """Root-relative path -> file id, with extensionless and directory keys."""
+
+    def __init__(self, paths: list[str]):
+        self.ids: dict[str, int] = {}
+        for i, rel in enumerate(paths):
+            self.ids[rel] = i
+        for i, rel in enumerate(paths):
+            self.ids.setdefault(posixpath.splitext(rel)[0], i)
+        for i, rel in enumerate(paths):  # lowest priority: a dir names its index file
+            d, _, fn = rel.rpartition("/")
+            if posixpath.splitext(fn)[0] in INDEX_STEMS:
+                self.ids.setdefault(d or ".", i)
+
+    def find(self, path: str) -> int | None:
+        fid = self.ids.get(path)
+        if fid is None:
+            # "./util.js" written for util.ts, "pkg/mod.py" imported as "pkg.mod"
+            stem, ext = posixpath.splitext(path)
+            if ext:
+                fid = self.ids.get(stem)
+        return fid
+
+
+class CSRGraph:
+    """Append-only CSR adjacency, filled one source file at a time in id order."""
+
+    def __init__(self):
+        self.offsets = array("I", [0])
+        self.targets = array("I")
+        self.weights = array("I")
+
+    def append_row(self, row: dict[int, int]) -> None:
+        for dst in sorted(row):
+            self.targets.append(dst)
+            self.weights.append(row[dst])
+        self.offsets.append(len(self.targets))
+
+    def edges(self):
+        """(src, dst, weight) triples in (src, dst) order."""
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        for src in range(len(offsets) - 1):
+            for k in range(offsets[src], offsets[src + 1]):
+                yield src, targets[k], weights[k]
+
+
+def file_graph(root: Path, max_files: int, cache: rm.ScanCache | None = None, jobs: int = 1,
+               enumerate_with: str = "auto", guard: tuple[int, bool] = (rm.MAX_BYTES, True),
+               resolver: rm.RelativeResolver | None = None, pool=None) -> dict:
+    """The file-level import graph of `root`: files by id and the edges as a
+    CSRGraph (see `write` for the serialized forms)."""
+    resolver = resolver or rm.RelativeResolver(root)
+    enum = {"backend": None, "listed": 0, "ms": 0.0}
+    manifests: list[tuple[Path, str]] = []
+    state = {"files": 0, "truncated": False}
+    listed = list(rm._sources(rm.enumerate_files(root, enumerate_with, enum), root, manifests,
+                              state, max_files))
+    paths = [rel for rel, _ in listed]
+    index = FileIndex(paths)
+    init_dirs = {rel.rpartition("/")[0] for rel in paths if rel.endswith("/__init__.py")
+                 or rel == "__init__.py"}
+    py_roots = sorted(rm.python_roots(init_dirs, manifests, root)[0], key=lambda r: (-len(r), r))
+    aliases = rm.ts_alias_scopes(root, manifests)
+    workspaces = rm.workspace_packages(root, manifests)
+    memo: dict[tuple[str, str, str], int | None] = {}  # bare imports
+
+    def resolve_bare(importer_dir: str, lang: str, target: str) -> int | None:
+        if lang == "python":
+            parts = target.split(".")
+            for n in range(len(parts), 0, -1):
+                for r in py_roots:
+                    fid = index.find("/".join(p for p in (r, *parts[:n]) if p))
+                    if fid is not None:
+                        return fid
+            return None
+        if lang == "ts/js":
+            path = rm._ts_path(target, importer_dir, aliases, workspaces)
+            return None if path is None else index.find(path)
+        return None
+
+    graph = CSRGraph()
+    unresolved = {"relative": 0, "bare": 0}
+    for fid, (rel, _, lang, _, targets, _) in enumerate(
+            rm._records(root, iter(listed), cache, jobs, guard, pool)):
+        importer_dir = rel.rpartition("/")[0]
+        row: dict[int, int] = {}
+        for target in targets:
+            if lang == "python" and target.startswith("."):
+                target = rm._py_relative(target)
+            relative = target.startswith(".")
+            if relative:  # the resolver memoizes the path; the lookup is one dict hit
+                path = resolver.locate(importer_dir, target)
+                dst = None if path is None else index.find(path)
+            else:
+                key = (importer_dir if lang == "ts/js" else "", lang, target)
+                if key not in memo:
+                    memo[key] = resolve_bare(importer_dir, lang, target)
+                dst = memo[key]
+            if dst is None:
+                unresolved["relative" if relative else "bare"] += 1
+            elif dst != fid:
+                row[dst] = row.get(dst, 0) + 1
+        graph.append_row(row)
+    if cache:
+        cache.close()
+
+    enum["ms"] = round(enum["ms"], 1)
+    return {
+        "root": str(root),
+        "granularity": "file",
+        "file_count": len(paths),
+        "edge_count": len(graph.targets),
+        "truncated": state["truncated"],
+        "files": paths,
+        "edges": graph,
+        "unresolved": unresolved,
+        "enumeration": enum,
+        "cache": cache.report() if cache else {"enabled": False, "hits": 0, "misses": 0},
+    }
+
+
+def write(result: dict, out, ndjson: bool = False) -> None:
+    """Serialize a file_graph result to binary stream `out` without
+    materializing the edges as Python lists. JSON: the summary fields, `files`
+    (id = position) and `edges` as [src, dst, weight] rows, one per line.
+    NDJSON: one `file` record per id, one `edge` record per edge, then a
+    `summary`."""
+    result = dict(result)
+    files, graph = result.pop("files"), result.pop("edges")
+
+    def put(text: str) -> None:
+        out.write(text.encode("utf-8"))
+
+    if ndjson:
+        for fid, path in enumerate(files):
+            put(json.dumps({"type": "file", "id": fid, "path": path}, ensure_ascii=False) + "\n")
+        for src, dst, w in graph.edges():
+            put(f'{{"type": "edge", "from": {src}, "to": {dst}, "weight": {w}}}\n')
+        put(json.dumps({"type": "summary", **result}, ensure_ascii=False) + "\n")
+        return
+    put(json.dumps(result, ensure_ascii=False, indent=2)[:-2] + ",\n")
+    put('  "files": ' + json.dumps(files, ensure_ascii=False) + ",\n")
+    put('  "edges": [')
+    sep = "\n    "
+    for src, dst, w in graph.edges():
+        put(f"{sep}[{src}, {dst}, {w}]")
+        sep = ",\n    "
+    put("\n  ]\n}\n")
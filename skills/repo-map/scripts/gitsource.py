@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""repo-map git-object backend — read a repository's trees and blobs without a
+checkout.
+
+`ls_tree` lists a commit's files (path -> blob id) from tree objects only, and
+`CatFile` streams blob contents through ONE long-lived `git cat-file --batch`
+process, so reading N files costs one subprocess, not N. `GitTree` gives the
+manifest readers in scan.py the same read_text/exists/is_file view of a commit
+that `LocalTree` gives of a working directory.
+
+`scan_rev(root, rev)` is `scan.py --rev COMMIT`: the same JSON skeleton as a
+worktree scan, built from one commit's objects — no checkout, no temporary
+files, so it works on bare mirrors. `diff(root, a, b)` is `scan.py --diff A..B`: the module/edge delta between two
+commits, reading only the blobs of paths that changed between the two trees.
+`churn(root, days)` is `scan.py --churn DAYS`: recent activity per module from
+one streamed `git log --numstat` pass.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import scan as rm  # noqa: E402
+
+
+class GitError(Exception):
+    """A git command failed (bad revision, not a repository)."""
+
+
+def _git(root: Path, *args: str) -> bytes:
+    proc = subprocess.run(["git", "-C", str(root), *args], capture_output=True)
+    if proc.returncode != 0:
+        raise GitError(proc.stderr.decode("utf-8", errors="replace").strip()
+                       or f"git {args[0]} failed")
+    return proc.stdout
+
+
+def rev_parse(root: Path, rev: str) -> str:
+    """Full commit id of `rev`; GitError when it does not name a commit."""
+    try:
+        return _git(root, "rev-parse", "--verify", "--quiet",
+                    f"{rev}^{{commit}}").decode().strip()
+    except GitError:
+        raise GitError(f"not a commit: {rev}") from None
+
+
+def ls_tree(root: Path, rev: str) -> dict[str, str]:
+    """Root-relative posix path -> blob id for every file in `rev`'s tree, in
+    path order. Submodules (commit entries) are not files and are left out."""
+    out: dict[str, str] = {}
+    for entry in _git(root, "ls-tree", "-r", "-z", "--full-tree", rev).split(b"\0"):
+        if not entry:
+            continue
+        meta, _, path = entry.partition(b"\t")
+        _, kind, oid = meta.split(b" ")
+        if kind == b"blob":
+            out[os.fsdecode(path)] = oid.decode()
+    return out
+
+
+def changed_paths(root: Path, a: str, b: str) -> set[str]:
+    """Paths whose blob differs between commits `a` and `b` (added, deleted or
+    modified; a rename counts as a delete plus an add)."""
+    out = _git(root, "diff-tree", "-r", "-z", "--no-renames", "--name-only", a, b)
+    return {os.fsdecode(p) for p in out.split(b"\0") if p}
+
+
+class CatFile:
+    """One `git cat-file --batch` process for a repository, fed object ids."""
+
+    def __init__(self, root: Path):
+        self.proc = subprocess.Popen(["git", "-C", str(root), "cat-file", "--batch"],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL)
+        self.reads = 0
+
+    def read(self, oid: str) -> bytes | None:
+        """Contents of blob `oid`; None when it is missing or not a blob."""
+        self.proc.stdin.write(oid.encode() + b"\n")
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        if len(header) != 3:  # "<oid> missing" / "<oid> ambiguous"
+            return None
+        data = self.proc.stdout.read(int(header[2]))
+        self.proc.stdout.read(1)  # trailing LF
+        self.reads += 1
+        return data if header[1] == b"blob" else None
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+        self.proc.stdout.close()
+
+    def __enter__(self) -> CatFile:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class GitTree(rm.LocalTree):
+    """The manifest readers' view of one commit: paths under `root` map to
+    blobs of `files` (ls_tree output), read through `cat`. Several readers
+    parse the same manifests, so decoded texts are kept per blob."""
+
+    def __init__(self, root: Path, files: dict[str, str], cat: CatFile):
+        self.root, self.files, self.cat = root, files, cat
+        self._dirs: set[str] | None = None
+        self._texts: dict[str, str] = {}
+
+    def _rel(self, path: Path) -> str:
+        return Path(os.path.normpath(path)).relative_to(self.root).as_posix()
+
+    def read_text(self, path: Path) -> str:
+        try:
+            oid = self.files[self._rel(path)]
+        except (KeyError, ValueError):
+            raise FileNotFoundError(str(path)) from None
+        if oid not in self._texts:
+            data = self.cat.read(oid)
+            if data is None:
+                raise FileNotFoundError(str(path))
+            self._texts[oid] = data.decode("utf-8", errors="ignore")
+        return self._texts[oid]
+
+    def is_file(self, path: Path) -> bool:
+        try:
+            return self._rel(path) in self.files
+        except ValueError:
+            return False
+
+    def exists(self, path: Path) -> bool:
+        if self._dirs is None:
+            self._dirs = {rel[:i] for rel in self.files
+                          for i, c in enumerate(rel) if c == "/"}
+        try:
+            rel = self._rel(path)
+        except ValueError:
+            return False
+        return rel in self.files or rel in self._dirs
+
+
+def tree_paths(files: dict[str, str]) -> list[str]:
+    """The paths of `files` a worktree scan would list: pruned dirs dropped."""
+    return [rel for rel in files if not rm.is_pruned(tuple(rel.split("/")[:-1]))]
+
+
+def blob_record(cat: CatFile, oid: str, rel: str, lang: str, guard: tuple[int, bool]
+                ) -> tuple[int, list[str], str | None]:
+    """(loc, targets, skip) of one blob, with the same guard as a file read."""
+    data = cat.read(oid)
+    if data is None:
+        return 0, [], None
+    skip = rm._skip_by_stat(rel, len(data), guard)
+    if skip:
+        return 0, [], skip
+    return rm.extract_from(io.BytesIO(data), lang, guard)
+
+
+def _blob_records(root: Path, files: dict[str, str], sources: Iterable[tuple[str, str]],
+                  cat: CatFile, guard: tuple[int, bool]
+                  ) -> Iterator[tuple[str, str, str, int, list[str], str | None]]:
+    """The git-object counterpart of scan._records: (rel, lang) -> record."""
+    for rel, lang in sources:
+        mod = rm.module_key(tuple(rel.split("/")[:-1]))
+        yield (rel, mod, lang, *blob_record(cat, files[rel], rel, lang, guard))
+
+
+def scan_rev(root: Path, rev: str, max_files: int,
+             emit: Callable[[dict], None] | None = None,
+             guard: tuple[int, bool] = (rm.MAX_BYTES, True),
+             resolver: rm.RelativeResolver | None = None) -> dict:
+    """scan.scan for commit `rev` of the repository at `root` (a work tree or a
+    bare repo), reading trees and blobs from the object store."""
+    commit = rev_parse(root, rev)
+    t0 = time.perf_counter()
+    files = ls_tree(root, commit)
+    paths = tree_paths(files)
+    enum = {"backend": "git-objects", "listed": len(paths),
+            "ms": (time.perf_counter() - t0) * 1000}
+    manifests: list[tuple[Path, str]] = []
+    state = {"files": 0, "truncated": False}
+    sk = rm.Skeleton(root, resolver)
+    with CatFile(root) as cat:
+        sources = rm._sources(paths, root, manifests, state, max_files)
+        rm.fold(sk, _blob_records(root, files, sources, cat, guard), emit)
+        result = sk.result(manifests, state["files"], state["truncated"], enum,
+                           {"enabled": False, "hits": 0, "misses": 0},
+                           GitTree(root, files, cat))
+    return {**result, "rev": commit}
+
+
+def _side(root: Path, files: dict[str, str], read: set[str] | None, cat: CatFile,
+          guard: tuple[int, bool]) -> tuple[rm.Skeleton, list[tuple[Path, str]], GitTree]:
+    """Skeleton of one commit: every file placed, only `read` (None = all)
+    absorbed from its blob."""
+    sk = rm.Skeleton(root)
+    manifests: list[tuple[Path, str]] = []
+    state = {"files": 0, "truncated": False}
+    for rel, lang in rm._sources(tree_paths(files), root, manifests, state, sys.maxsize):
+        mod = rm.module_key(tuple(rel.split("/")[:-1]))
+        if read is None or rel in read:
+            sk.add(rel, mod, lang, *blob_record(cat, files[rel], rel, lang, guard))
+        else:
+            sk.place(rel, mod, lang)
+    return sk, manifests, GitTree(root, files, cat)
+
+
+def diff(root: Path, a: str, b: str, guard: tuple[int, bool] = (rm.MAX_BYTES, True)) -> dict:
+    """Module/edge delta from commit `a` to commit `b`.
+
+    Both trees are listed (tree objects only), so module file counts, source
+    roots and Python packages are exact on each side; blobs are read only for
+    changed paths, whose LOC and imports are the only ones that can differ.
+    When a manifest changed, the resolution context (workspaces, aliases,
+    package names) may re-route imports of unchanged files too, so every source
+    blob is read on both sides — `full` in the output says so.
+
+    Edges carry `delta` always, and the true `base`/`head` weights only when
+    `full`: otherwise unchanged files' imports are not read, so per-side sums
+    would undercount every edge they also feed."""
+    base, head = rev_parse(root, a), rev_parse(root, b)
+    files_a, files_b = ls_tree(root, base), ls_tree(root, head)
+    changed = changed_paths(root, base, head)
+    full = any(rel.rsplit("/", 1)[-1] in rm.MANIFESTS for rel in changed)
+    with CatFile(root) as cat:
+        sides = []
+        for files in (files_a, files_b):
+            sk, manifests, tree = _side(root, files, None if full else changed, cat, guard)
+            edges, external = sk.graph(manifests, tree)
+            _, declared = rm.detect_stack(manifests, tree)
+            sides.append((sk, edges, external, set(declared)))
+        blobs = cat.reads
+
+    (sk_a, edges_a, ext_a, dec_a), (sk_b, edges_b, ext_b, dec_b) = sides
+    mods_a, mods_b = sk_a.modules, sk_b.modules
+    changed_mods = []
+    for key in sorted(mods_a.keys() & mods_b.keys()):
+        files = mods_b[key]["files"] - mods_a[key]["files"]
+        loc = mods_b[key]["loc"] - mods_a[key]["loc"]
+        if files or loc:
+            changed_mods.append({"path": key, "files": files, "loc": loc})
+    edge_list = []
+    for pair in edges_a.keys() | edges_b.keys():
+        wa, wb = edges_a.get(pair, 0), edges_b.get(pair, 0)
+        if wa != wb:
+            edge = {"from": pair[0], "to": pair[1], "delta": wb - wa}
+            if full:
+                edge.update(base=wa, head=wb)
+            edge_list.append(edge)
+    edge_list.sort(key=lambda e: (-abs(e["delta"]), e["from"], e["to"]))
+    uses = {n: ext_b.get(n, 0) - ext_a.get(n, 0) for n in ext_a.keys() | ext_b.keys()}
+
+    return {
+        "root": str(root),
+        "base": base,
+        "head": head,
+        "changed_files": sum(1 for rel in changed
+                             if os.path.splitext(rel)[1].lower() in rm.EXT_TO_LANG),
+        "blobs_read": blobs,
+        "full": full,
+        "modules": {
+            "added": [rm.module_record(mods_b[k]) for k in sorted(mods_b.keys() - mods_a.keys())],
+            "removed": [rm.module_record(mods_a[k]) for k in sorted(mods_a.keys() - mods_b.keys())],
+            "changed": changed_mods,
+        },
+        "edges": edge_list,
+        "dependencies": {"added": sorted(dec_b - dec_a), "removed": sorted(dec_a - dec_b)},
+        "external": [{"name": n, "delta": d}
+                     for n, d in sorted(uses.items(), key=lambda kv: (-kv[1], kv[0])) if d],
+    }
+
+
+CHURN_CHUNK = 1 << 16
+COMMIT_MARK = b"\x01"
+
+
+def _log_tokens(root: Path, *args: str) -> Iterator[bytes]:
+    """NUL-separated tokens of `git log -z ...`, read from the pipe in chunks
+    so the history is never held in memory."""
+    proc = subprocess.Popen(["git", "-C", str(root), "log", "-z", *args],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    tail = b""
+    try:
+        while True:
+            chunk = proc.stdout.read(CHURN_CHUNK)
+            if not chunk:
+                break
+            *tokens, tail = (tail + chunk).split(b"\0")
+            yield from tokens
+        if tail:
+            yield tail
+        err = proc.stderr.read()
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stderr.close()
+    if proc.returncode != 0:
+        raise GitError(err.decode("utf-8", errors="replace").strip() or "git log failed")
+
+
+def churn(root: Path, days: int, rev: str = "HEAD", modules: Iterable[str] | None = None
+          ) -> dict:
+    """Commits, lines changed (added + deleted) and distinct authors per module
+    over the last `days` days of `rev`'s history under `root`, hottest first.
+
+    One `git log --numstat -z` stream: each commit is a \\x01-marked hash and
+    author email, then "added<TAB>deleted<TAB>path" tokens (binary files show
+    "-" counts and add no lines). Paths fold to module keys exactly as the scan
+    folds source files; with `modules`, only those keys are reported. Merges
+    carry no numstat, so they count for no module."""
+    wanted = None if modules is None else set(modules)
+    stats: dict[str, list] = {}  # module -> [commits, lines, authors]
+    total = 0
+    touched: set[str] = set()
+    author = ""
+    tokens = _log_tokens(root, "--numstat", "--no-renames", "--relative",
+                         f"--since={days}.days", "--format=%x01%H%x00%aE", rev, "--", ".")
+    for tok in tokens:
+        if tok.startswith(COMMIT_MARK):
+            total += 1
+            touched = set()
+            author = next(tokens, b"").decode("utf-8", errors="replace").lower()
+            continue
+        added, _, rest = tok.lstrip(b"\n").partition(b"\t")
+        deleted, _, path = rest.partition(b"\t")
+        if not path:
+            continue
+        parts = tuple(os.fsdecode(path).split("/")[:-1])
+        if rm.is_pruned(parts):
+            continue
+        mod = rm.module_key(parts)
+        if wanted is not None and mod not in wanted:
+            continue
+        entry = stats.get(mod)
+        if entry is None:
+            entry = stats[mod] = [0, 0, set()]
+        if mod not in touched:
+            touched.add(mod)
+            entry[0] += 1
+            entry[2].add(author)
+        if added.isdigit() and deleted.isdigit():
+            entry[1] += int(added) + int(deleted)
+
+    ranked = sorted(stats.items(), key=lambda kv: (-kv[1][0], -kv[1][1], kv[0]))
+    return {
+        "days": days,
+        "commits": total,
+        "modules": [{"path": mod, "commits": c, "lines": lines, "authors": len(who)}
+                    for mod, (c, lines, who) in ranked],
+    }
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""repo-map graph analytics — structural facts about the module graph.
+
+The scan's `internal_edges` are raw weights; the facts MAP.md is written from
+(cycles, layering, hubs) are computed here so the model does not have to eyeball
+them on big graphs. Everything is linear in modules + edges except the rank,
+which is a fixed number of linear passes:
+
+- cycles:  strongly connected components with more than one module (Tarjan,
+           iterative so deep graphs cannot hit the recursion limit)
+- layers:  a topological layering of the condensed DAG, bottom-up — layer 0
+           depends on nothing internal, layer k only on layers below k; a cycle
+           group shares one layer
+- fan_in / fan_out: distinct internal importers / dependencies per module
+- centrality: weighted PageRank over the edges (who everything leans on)
+"""
+
+from __future__ import annotations
+
+RANK_ITERATIONS = 20
+DAMPING = 0.85
+
+
+def sccs(nodes: list[str], succ: dict[str, list[str]]) -> list[list[str]]:
+    """Tarjan's SCCs, iteratively. Components come out in reverse topological
+    order: every component is emitted after all the components it reaches."""
+    index: dict[str, int] = {}
+    low: dict[str, int] = {}
+    on_stack: set[str] = set()
+    stack: list[str] = []
+    out: list[list[str]] = []
+    for start in nodes:
+        if start in index:
+            continue
+        index[start] = low[start] = len(index)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(succ.get(start, ())))]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if w not in index:
+                    index[w] = low[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(succ.get(w, ()))))
+                    break
+                if w in on_stack:
+                    low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    comp = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        comp.append(w)
+                        if w == v:
+                            break
+                    out.append(sorted(comp))
+    return out
+
+
+def analyze(modules: list[str], edges: dict[tuple[str, str], int]) -> dict:
+    """The `graph` section of the scan JSON for module keys `modules` and
+    (from, to) -> weight `edges`."""
+    nodes = sorted(set(modules).union(*edges) if edges else set(modules))
+    succ: dict[str, list[str]] = {n: [] for n in nodes}
+    fan_in = dict.fromkeys(nodes, 0)
+    for a, b in sorted(edges):
+        succ[a].append(b)
+        fan_in[b] += 1
+
+    comps = sccs(nodes, succ)
+    comp_of = {n: i for i, comp in enumerate(comps) for n in comp}
+    layer_of_comp: list[int] = []
+    for i, comp in enumerate(comps):  # reverse topological: dependencies first
+        deps = {comp_of[w] for v in comp for w in succ[v]} - {i}
+        layer_of_comp.append(1 + max((layer_of_comp[d] for d in deps), default=-1))
+    layers: list[list[str]] = [[] for _ in range(max(layer_of_comp, default=-1) + 1)]
+    for n in nodes:
+        layers[layer_of_comp[comp_of[n]]].append(n)
+
+    # Weighted PageRank: rank flows from importer to imported module, so the
+    # modules everything depends on come out on top. Sinks spread evenly.
+    # Push-style passes over integer ids keep each iteration one edge sweep.
+    ids = {n: i for i, n in enumerate(nodes)}
+    n_nodes = len(nodes) or 1
+    out_weight = [0] * len(nodes)
+    for (a, _), w in edges.items():
+        out_weight[ids[a]] += w
+    flows = [(ids[a], ids[b], DAMPING * w / out_weight[ids[a]]) for (a, b), w in edges.items()]
+    sinks = [i for i, w in enumerate(out_weight) if not w]
+    rank = [1.0 / n_nodes] * len(nodes)
+    for _ in range(RANK_ITERATIONS):
+        base = (1 - DAMPING + DAMPING * sum(rank[i] for i in sinks)) / n_nodes
+        new = [base] * len(nodes)
+        for a, b, k in flows:
+            new[b] += rank[a] * k
+        rank = new
+
+    metrics = [{"path": n, "layer": layer_of_comp[comp_of[n]],
+                "fan_in": fan_in[n], "fan_out": len(succ[n]),
+                "centrality": round(rank[ids[n]], 4)} for n in nodes]
+    metrics.sort(key=lambda m: (-m["centrality"], m["path"]))
+    return {
+        "cycles": sorted((c for c in comps if len(c) > 1), key=lambda c: (-len(c), c)),
+        "layers": layers,
+        "metrics": metrics,
+    }
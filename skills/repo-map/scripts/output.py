@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""repo-map output shaping — what of the scan JSON reaches the reader.
+
+On a large repo the full skeleton (thousands of modules and edges, pretty-
+printed) is bigger than anyone wants in context. These are the knobs:
+
+- `project`: keep only the named top-level sections (`--fields modules,graph`),
+  or one level down (`graph.cycles`)
+- `encode`: pretty (indent 2, the default) or compact separators (`--compact`)
+- `fit`: the largest prefix of the module ranking whose output fits a byte
+  budget (`--budget-bytes`), with the edges among the kept modules and a
+  `budget` summary of what was left out
+
+The module ranking is deterministic: centrality from `graph.metrics`, then
+file count, then path — the same order MAP.md is written in.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+
+
+def project(result: dict, fields: list[str] | None) -> dict:
+    """`result` with only `fields` kept, in the result's own key order.
+    Raises KeyError naming the first field that is not in the result."""
+    if not fields:
+        return result
+    top: dict[str, set[str] | None] = {}
+    for field in fields:
+        key, _, sub = field.partition(".")
+        if key not in result or (sub and not (isinstance(result[key], dict)
+                                              and sub in result[key])):
+            raise KeyError(field)
+        if not sub:
+            top[key] = None
+        elif top.get(key, set()) is not None:
+            top.setdefault(key, set()).add(sub)
+    out = {}
+    for key, value in result.items():
+        if key in top:
+            subs = top[key]
+            out[key] = value if subs is None else {k: v for k, v in value.items() if k in subs}
+    return out
+
+
+def encode(result: dict, compact: bool = False) -> bytes:
+    if compact:
+        text = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+    return (text + "\n").encode("utf-8")
+
+
+def rank_modules(result: dict) -> list[str]:
+    """Module keys, most important first."""
+    centrality = {m["path"]: m["centrality"] for m in result.get("graph", {}).get("metrics", ())}
+    mods = result.get("modules", [])
+    return [m["path"] for m in sorted(
+        mods, key=lambda m: (-centrality.get(m["path"], 0.0), -m["files"], m["path"]))]
+
+
+def _keep(result: dict, kept: set[str], limit: int) -> dict:
+    """`result` cut down to the modules in `kept` and the edges among them."""
+    out = dict(result)
+    mods = result.get("modules", [])
+    edges = result.get("internal_edges", [])
+    out["modules"] = [m for m in mods if m["path"] in kept]
+    out["internal_edges"] = [e for e in edges if e["from"] in kept and e["to"] in kept]
+    if "graph" in result:
+        g = result["graph"]
+        out["graph"] = {
+            **g,
+            "cycles": [c for c in g["cycles"] if kept.issuperset(c)],
+            "layers": [[n for n in layer if n in kept] for layer in g["layers"]],
+            "metrics": [m for m in g["metrics"] if m["path"] in kept],
+        }
+    if "symbols" in result:
+        out["symbols"] = {k: v for k, v in result["symbols"].items() if k in kept}
+    if "churn" in result:
+        out["churn"] = {**result["churn"],
+                        "modules": [m for m in result["churn"]["modules"] if m["path"] in kept]}
+    dropped = [m for m in mods if m["path"] not in kept]
+    cut = [e for e in edges if not (e["from"] in kept and e["to"] in kept)]
+    out["budget"] = {
+        "modules_kept": len(out["modules"]),
+        "modules_omitted": len(dropped),
+        "omitted_files": sum(m["files"] for m in dropped),
+        "omitted_loc": sum(m["loc"] for m in dropped),
+        "edges_omitted": len(cut),
+        "omitted_edge_weight": sum(e["weight"] for e in cut),
+        "limit": limit,
+        "fits": True,
+    }
+    return out
+
+
+def fit(result: dict, budget: int, fields: list[str] | None = None,
+        compact: bool = False) -> dict:
+    """The projected result for the largest number of top-ranked modules whose
+    encoding is at most `budget` bytes (binary search; output size grows with
+    the modules kept). When nothing else fits, the result keeps no modules and
+    `budget.fits` is false."""
+    order = rank_modules(result)
+
+    def shaped(k: int) -> dict:
+        return project(_keep(result, set(order[:k]), budget), fields + ["budget"]
+                       if fields else None)
+
+    lo, hi = 0, len(order)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if len(encode(shaped(mid), compact)) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    out = shaped(lo)
+    if len(encode(out, compact)) > budget:
+        out["budget"]["fits"] = False
+    return out
+
+
+def write(result: dict, out, fields: list[str] | None = None, compact: bool = False,
+          budget: int = 0, gzip_path: str | None = None) -> None:
+    """Shape `result` and write it to binary stream `out`, or gzipped to
+    `gzip_path` (mtime 0, so equal scans give equal files). The budget applies
+    to module skeletons; other documents (diffs, batch runs) are only projected."""
+    if budget > 0 and isinstance(result.get("modules"), list):
+        result = fit(result, budget, fields, compact)
+    else:
+        result = project(result, fields)
+    data = encode(result, compact)
+    if gzip_path:
+        with open(gzip_path, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+            gz.write(data)
+    else:
+        out.write(data)
@@ -12,21 +12,67 @@ good-enough structural map an agent can navigate, not a perfect AST. Internal
 edges are resolved at *directory* granularity (a module = a directory under a
 source root), which is the right altitude for a map.
 
+Per-file results (language, LOC, raw import targets) are kept in an on-disk
+cache keyed by (path, size, mtime, inode), so a re-scan only re-reads files that
+changed; module/edge aggregation is always rebuilt from the records. The cache
+lives outside the repo (see `cache_path`) and degrades to a no-op when sqlite3
+is unavailable or the cache file cannot be opened.
+
 Usage:
-    python scan.py [--root DIR] [--json] [--max-files N]
+    python scan.py [--root DIR] [--json] [--max-files N] [--jobs N]
+                   [--enumerate auto|git|walk] [--no-cache | --rebuild] [--cache PATH]
+                   [--ndjson] [--granularity module|file]
+                   [--max-bytes N] [--no-skip] [--follow-symlinks] [--profile]
+                   [--serve | --client [scan|status|stop]] [--socket PATH | --port N]
+                   [--poll SECONDS]
+                   [--rev COMMIT | --diff A..B] [--workspace BRAIN | --roots-from FILE]
+                   [--churn DAYS] [--symbols] [--fingerprint]
+                   [--fields A,B] [--compact] [--gzip FILE] [--budget-bytes N]
     # default: scans CWD, prints JSON to stdout (UTF-8)
+    # --ndjson: one record per line ({"type": "module" | "edge" | "summary"}),
+    #           modules streamed as they finalize — for very large trees
+    # --serve: long-lived daemon (daemon.py); --client asks it, else scans once
+    # --rev / --diff: scan a commit / delta between commits from git objects,
+    #                  no checkout, bare repos too (gitsource.py)
+    # --workspace / --roots-from: many repos in one process + cross-repo edges (batch.py)
+    # --granularity file: file-level import graph, integer ids, CSR edges (filegraph.py)
+    # --churn DAYS: commits, lines changed and authors per module from git history
+    # --symbols: top-level public functions, classes and exports per file
+    # --fingerprint: hash only the structure and compare it with MAP.md's stamp
+    # --fields / --compact / --gzip / --budget-bytes: shape the output — pick
+    #           fields, drop indentation, write gzipped, or keep the top-ranked
+    #           modules that fit in N bytes (output.py)
 """
 
 from __future__ import annotations
 
 import argparse
+import ast
+import fnmatch
+import hashlib
+import heapq
+import io
 import json
 import os
+import posixpath
 import re
+import subprocess
 import sys
-from collections import defaultdict
+import time
+from collections.abc import Callable, Iterable, Iterator
+from functools import lru_cache
+from itertools import groupby, islice, repeat
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import graph  # noqa: E402
+
+try:
+    import sqlite3
+except ImportError:  # minimal Python builds ship without _sqlite3
+    sqlite3 = None
+
 # Directories never worth mapping.
 PRUNE = {
     ".git", "node_modules", "dist", "build", "out", "target", ".venv", "venv",
@@ -35,38 +81,101 @@ PRUNE = {
     ".pytest_cache", ".mypy_cache", ".ruff_cache", "site-packages",
 }
 
-# Per-language: file extensions + import regexes (capture the imported module).
+_GO_SPEC = re.compile(rb'^(?:[\w.]+\s+)?["`]([^"`]+)["`]')
+
+
+def _go_imports(region: bytes) -> list[bytes]:
+    """Import paths from a Go file header: `import "p"`, `import alias "p"` and
+    `import ( ... )` blocks. Only import specs are read, so ordinary string
+    literals never become edges."""
+    out: list[bytes] = []
+    in_block = False
+    for line in region.split(b"\n"):
+        s = line.split(b"//", 1)[0].strip()
+        if not in_block:
+            if not s.startswith(b"import"):
+                continue
+            s = s[6:].strip()
+            if s.startswith(b"("):
+                in_block = True
+                s = s[1:].strip()
+        if in_block:
+            if s.startswith(b")"):
+                in_block = False
+                continue
+            if s.endswith(b")"):  # `import ("a")` on one line
+                in_block = False
+                s = s[:-1].strip()
+        m = _GO_SPEC.match(s)
+        if m:
+            out.append(m.group(1))
+    return out
+
+
+# Per-language: file extensions, import extraction (bytes regexes capturing the
+# imported module, or a `parse` function) and `header_end` — the first line of
+# non-import code. Extraction stops there: Python, Go and Rust keep imports at
+# the top, so the rest of the file is only newline-counted, never decoded or
+# regexed (function-local imports are deliberately not mapped). TS/JS has no
+# header bound — `require()`/`import()` appear anywhere.
 LANGS = {
     "ts/js": {
         "ext": {".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs"},
         "imports": [
-            re.compile(r"""import\s+(?:[\w*{},\s]+\s+from\s+)?["']([^"']+)["']"""),
-            re.compile(r"""require\(\s*["']([^"']+)["']\s*\)"""),
-            re.compile(r"""export\s+(?:[\w*{},\s]+\s+)?from\s+["']([^"']+)["']"""),
+            re.compile(rb"""import\s+(?:[\w*{},\s]+\s+from\s+)?["']([^"']+)["']"""),
+            re.compile(rb"""require\(\s*["']([^"']+)["']\s*\)"""),
+            re.compile(rb"""export\s+(?:[\w*{},\s]+\s+)?from\s+["']([^"']+)["']"""),
         ],
+        "header_end": None,
     },
     "python": {
         "ext": {".py"},
         "imports": [
-            re.compile(r"^\s*import\s+([\w.]+)", re.M),
-            re.compile(r"^\s*from\s+([\w.]+)\s+import", re.M),
+            re.compile(rb"^\s*import\s+([\w.]+)", re.M),
+            re.compile(rb"^\s*from\s+([\w.]+)\s+import", re.M),
         ],
+        "header_end": re.compile(rb"^(?:def|class|async\s+def|@|if\s+__name__)\b", re.M),
     },
     "rust": {
         "ext": {".rs"},
-        "imports": [re.compile(r"^\s*use\s+([\w:]+)", re.M)],
+        "imports": [re.compile(rb"^\s*use\s+([\w:]+)", re.M)],
+        "header_end": re.compile(
+            rb"^(?:pub(?:\([^)]*\))?\s+)?(?:(?:async|const|unsafe|extern)\s+)*"
+            rb"(?:fn|struct|enum|impl|trait|type|static|union|macro_rules!)\b", re.M),
     },
     "go": {
         "ext": {".go"},
-        "imports": [re.compile(r'"([^"]+)"')],  # within import blocks; noisy but ok
+        "parse": _go_imports,
+        "header_end": re.compile(rb"^(?:func|type|var|const)\b", re.M),
     },
 }
 EXT_TO_LANG = {e: name for name, spec in LANGS.items() for e in spec["ext"]}
 
+# Top-level public symbols (--symbols): what a module exposes, so the model can
+# read an index instead of whole files. Python goes through `ast` (this regex is
+# only the fallback for files that do not parse); the others are line-anchored
+# bytes regexes capturing (kind, name). Rust wants plain `pub` at column 0, Go
+# an exported (capitalized) name; methods are left out.
+SYMBOLS = {
+    "python": [re.compile(rb"^(?:async\s+)?(def|class)\s+([A-Za-z]\w*)", re.M)],
+    "ts/js": [re.compile(
+        rb"^export\s+(?:declare\s+)?(?:default\s+)?(?:async\s+)?(?:abstract\s+)?"
+        rb"(function|class|const|let|var|interface|type|enum|namespace)\*?\s+([A-Za-z_$][\w$]*)",
+        re.M)],
+    "rust": [re.compile(
+        rb"^pub\s+(?:(?:async|unsafe|const|extern\s+\"[^\"]*\")\s+)*"
+        rb"(fn|struct|enum|trait|type|const|static|mod|union)\s+([A-Za-z_]\w*)", re.M)],
+    "go": [re.compile(rb"^(func|type|var|const)\s+([A-Z]\w*)", re.M)],
+}
+TS_EXPORT_LIST = re.compile(rb"^export\s*(?:type\s*)?\{([^}]*)\}", re.M)
+SYMBOL_CAP = 50  # per file
+
 # Manifests → (stack label, parser key)
 MANIFESTS = {
     "package.json": "Node/JS",
     "tsconfig.json": "TypeScript",
+    "jsconfig.json": "Node/JS",
+    "pnpm-workspace.yaml": "Node/JS",
     "Cargo.toml": "Rust",
     "go.mod": "Go",
     "pyproject.toml": "Python",
@@ -81,6 +190,23 @@ MANIFESTS = {
     "tauri.conf.json": "Tauri",
 }
 
+# Pathological-file guard: cheap checks that keep minified bundles, generated
+# stubs and vendored blobs out of the regex pass (and out of LOC/edge weights).
+MAX_BYTES = 1_000_000        # default --max-bytes; larger files are not read
+SAMPLE_BYTES = 8192          # first block sampled before reading the rest
+MAX_LINE = 1000              # a sampled line longer than this => minified
+# Generated files say so in their leading comment header: Go's standard line
+# (https://go.dev/s/generatedcode), or `@generated` (Meta/Rust/Relay tooling).
+# Only that header is checked, so a file that merely mentions the markers (a
+# docstring, a string constant) is still scanned.
+GO_GENERATED = re.compile(rb"^// Code generated .* DO NOT EDIT\.$")
+HEADER_COMMENT = re.compile(rb"^\s*(?://|#|/\*|\*|--)")
+HEADER_LINES = 5             # leading comment lines searched for `@generated`
+SKIPPED_CAP = 100            # skipped files listed in the JSON (all are counted)
+
+# MAP.md carries the fingerprint of the scan it was written from.
+MAP_STAMP = re.compile(r"<!--\s*repo-map:fingerprint\s+([0-9a-f]+)\s*-->")
+
 ENTRY_HINTS = (
     "src/main.rs", "src/lib.rs", "main.go", "src/index.ts", "src/index.tsx",
     "src/index.js", "src/main.ts", "src/main.tsx", "src/main.py", "main.py",
@@ -93,23 +219,220 @@ def is_pruned(parts: tuple[str, ...]) -> bool:
                and p not in {".github"}) for p in parts)
 
 
-def detect_stack(root: Path) -> tuple[list[str], list[str]]:
-    """Return (stack labels, declared external deps) from manifests."""
-    stack, deps = [], []
-    for name, label in MANIFESTS.items():
-        for m in root.rglob(name):
-            if is_pruned(m.relative_to(root).parts[:-1]):
+class GitIgnore:
+    """Stdlib subset of gitignore(5) for the non-git fallback walk.
+
+    Supports per-directory .gitignore files, `#` comments, `!` negation, a
+    trailing `/` (directories only), a leading or inner `/` (anchored to the
+    .gitignore's directory), `*`, `?`, `[...]` and `**`. Rules are kept per
+    directory and inherited downwards, so a check only consults its ancestors'
+    files; the last matching rule wins, as in git."""
+
+    def __init__(self, rules: list | None = None):
+        self.rules = rules or []  # (base dir rel posix, regex, negate, dir_only)
+
+    def child(self, base: str, gitignore: Path) -> "GitIgnore":
+        """The matcher for directory `base`: inherited rules + its .gitignore."""
+        try:
+            lines = gitignore.read_text(encoding="utf-8", errors="ignore").splitlines()
+        except OSError:
+            return self
+        rules = list(self.rules)
+        for line in lines:
+            rule = self._compile(line)
+            if rule:
+                rules.append((base, *rule))
+        return GitIgnore(rules)
+
+    @staticmethod
+    def _compile(line: str):
+        pat = line.rstrip()
+        if not pat or pat.startswith("#"):
+            return None
+        negate = pat.startswith("!")
+        if negate:
+            pat = pat[1:]
+        pat = pat.replace("\\#", "#").replace("\\!", "!")
+        dir_only = pat.endswith("/")
+        pat = pat.rstrip("/")
+        if not pat:
+            return None
+        anchored = "/" in pat
+        pat = pat.lstrip("/")
+        out, i = [], 0
+        while i < len(pat):
+            c = pat[i]
+            if pat.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pat.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            if c == "*":
+                out.append("[^/]*")
+            elif c == "?":
+                out.append("[^/]")
+            elif c == "[" and pat.find("]", i + 2) != -1:
+                j = pat.find("]", i + 2)  # a ']' right after '[' is literal
+                body = pat[i + 1:j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+            else:
+                out.append(re.escape(c))
+            i += 1
+        body = "".join(out)
+        rx = re.compile(("" if anchored else "(?:.*/)?") + body + r"\Z")
+        return rx, negate, dir_only
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        hit = False
+        for base, rx, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel.startswith(base + "/"):
+                    continue
+                sub = rel[len(base) + 1:]
+            else:
+                sub = rel
+            if rx.match(sub):
+                hit = not negate
+        return hit
+
+
+def _ls_files(root: Path, *flags: str) -> Iterator[str]:
+    """Stream `git ls-files -z` output as root-relative posix paths."""
+    proc = subprocess.Popen(["git", "-C", str(root), "ls-files", "-z", *flags],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    tail = b""
+    try:
+        for chunk in iter(lambda: proc.stdout.read(1 << 16), b""):
+            *names, tail = (tail + chunk).split(b"\0")
+            for name in names:
+                if name:
+                    yield os.fsdecode(name)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def _git_files(root: Path) -> Iterator[str] | None:
+    """Candidate files from the git index + untracked-but-not-ignored files, in
+    path order; None when `root` is not inside a git work tree. Nothing under an
+    ignored directory is ever stat-ed. The index is streamed (it is already
+    sorted); only the usually-small untracked and deleted lists are held. An
+    unmerged path, which the index lists once per conflict stage, is yielded
+    once."""
+    try:
+        probe = subprocess.run(["git", "-C", str(root), "rev-parse", "--is-inside-work-tree"],
+                               capture_output=True, timeout=30)
+    except Exception:
+        return None
+    if probe.returncode != 0 or probe.stdout.strip() != b"true":
+        return None
+    deleted = set(_ls_files(root, "--deleted"))  # still in the index, gone from disk
+    others = sorted(_ls_files(root, "--others", "--exclude-standard"))
+    merged = heapq.merge(_ls_files(root, "--cached"), others)
+    return (r for r, _ in groupby(merged) if r not in deleted)
+
+
+def _walk_files(root: Path) -> Iterator[str]:
+    """Fallback enumeration outside git: a pruned scandir walk honoring
+    .gitignore, yielding files in the same path order as the git index
+    (siblings sorted with directories keyed as "name/")."""
+    def visit(dirpath: str, prefix: str, ign: GitIgnore) -> Iterator[str]:
+        try:
+            with os.scandir(dirpath) as it:
+                entries = list(it)
+        except OSError:
+            return
+        items = []
+        for e in entries:
+            try:
+                is_dir = e.is_dir()
+                if is_dir and e.is_symlink():
+                    continue  # like os.walk: never descend through symlinks
+            except OSError:
                 continue
-            if label not in stack:
-                stack.append(label)
-            deps += _manifest_deps(m, name)
-            break  # one per manifest type is enough for a label
+            if e.name == ".gitignore" and not is_dir:
+                ign = ign.child(prefix.rstrip("/"), Path(e.path))
+            items.append((e.name + "/" if is_dir else e.name, e.name, is_dir))
+        for _, name, is_dir in sorted(items):
+            rel = prefix + name
+            if is_dir:
+                if not is_pruned((name,)) and not ign.ignored(rel, True):
+                    yield from visit(os.path.join(dirpath, name), rel + "/", ign)
+            elif not ign.ignored(rel, False):
+                yield rel
+
+    yield from visit(str(root), "", GitIgnore())
+
+
+def enumerate_files(root: Path, backend: str, stats: dict) -> Iterator[str]:
+    """Stream every candidate file of the tree once, as root-relative posix
+    paths in path order. `backend` is "git" (index + untracked, honoring
+    .gitignore), "walk" (scandir + stdlib .gitignore matcher) or "auto" (git when
+    available). PRUNE/hidden-dir rules apply to both. Fills stats["backend"],
+    stats["listed"] and stats["ms"] (time spent producing paths)."""
+    t0 = time.perf_counter()
+    rels = _git_files(root) if backend in ("auto", "git") else None
+    stats["backend"] = "git" if rels is not None else "walk"
+    if rels is None:
+        rels = _walk_files(root)
+    rels = iter(rels)
+    while True:
+        try:
+            rel = next(rels)
+        except StopIteration:
+            break
+        finally:
+            stats["ms"] += (time.perf_counter() - t0) * 1000
+        stats["listed"] += 1
+        if "/" in rel and is_pruned(tuple(rel.split("/")[:-1])):
+            t0 = time.perf_counter()
+            continue
+        yield rel
+        t0 = time.perf_counter()
+
+
+class LocalTree:
+    """How the manifest readers see the tree: the checked-out working directory.
+    Other backends (git objects, see gitsource.py) supply the same three calls
+    for paths under a virtual root."""
+
+    def read_text(self, path: Path) -> str:
+        return path.read_text(encoding="utf-8", errors="ignore")
+
+    def exists(self, path: Path) -> bool:
+        return path.exists()
+
+    def is_file(self, path: Path) -> bool:
+        return path.is_file()
+
+
+LOCAL = LocalTree()
+
+
+def detect_stack(manifests: list[tuple[Path, str]], tree: LocalTree = LOCAL
+                 ) -> tuple[list[str], list[str]]:
+    """Return (stack labels, declared external deps) from every manifest found by
+    the enumeration — a monorepo's nested manifests all contribute their deps."""
+    found = {name for _, name in manifests}
+    stack = [label for name, label in MANIFESTS.items() if name in found]
+    stack = _dedupe(stack)
+    deps: list[str] = []
+    for path, name in manifests:
+        deps += _manifest_deps(path, name, tree)
     return stack, sorted(set(deps))
 
 
-def _manifest_deps(path: Path, name: str) -> list[str]:
+def _manifest_deps(path: Path, name: str, tree: LocalTree = LOCAL) -> list[str]:
     try:
-        text = path.read_text(encoding="utf-8", errors="ignore")
+        text = tree.read_text(path)
     except Exception:
         return []
     out: list[str] = []
@@ -153,11 +476,8 @@ def module_key(dir_parts: tuple[str, ...]) -> str:
     return "/".join(dir_parts[:2])
 
 
-def module_of(rel_path: Path, source_roots: set[str]) -> str:
-    return module_key(rel_path.parts[:-1])  # drop filename
-
-
-def internal_packages(root: Path) -> dict[str, str]:
+def internal_packages(root: Path, manifests: list[tuple[Path, str]],
+                      tree: LocalTree = LOCAL) -> dict[str, str]:
     """Map an internal package/crate NAME -> its module key, so bare imports of
     sibling workspace packages (e.g. Rust `use my_crate::…`) resolve to internal
     edges. Names are normalized so hyphen/underscore variants both match."""
@@ -170,28 +490,334 @@ def internal_packages(root: Path) -> dict[str, str]:
         for variant in {name, name.replace("-", "_"), name.replace("_", "-")}:
             reg[variant] = key
 
-    for cargo in root.rglob("Cargo.toml"):
-        rel = cargo.relative_to(root)
-        if is_pruned(rel.parts[:-1]):
+    for path, name in manifests:
+        rel = path.relative_to(root)
+        if name == "Cargo.toml":
+            try:
+                txt = tree.read_text(path)
+            except Exception:
+                continue
+            m = re.search(r'(?ms)^\[package\][^\[]*?^\s*name\s*=\s*"([^"]+)"', txt)
+            if m:
+                add(m.group(1), rel.parts[:-1])
+        elif name == "package.json" and len(rel.parts) > 1:
+            # root package.json isn't an internal sibling
+            try:
+                data = json.loads(tree.read_text(path))
+                if isinstance(data.get("name"), str):
+                    add(data["name"], rel.parts[:-1])
+            except Exception:
+                pass
+    return reg
+
+
+def _pyproject_packages(path: Path, rel_dir: str, tree: LocalTree = LOCAL
+                        ) -> tuple[set[str], list[tuple[str, str]]]:
+    """(sys.path roots, [(root, dotted package name)]) declared by a pyproject:
+    setuptools `package-dir` / `packages.find.where` / `packages`, poetry
+    `packages = [{include, from}]` and hatch `packages = ["src/pkg"]`. Cheap
+    line/regex reading, like _manifest_deps — not a TOML parser."""
+    try:
+        text = tree.read_text(path)
+    except Exception:
+        return set(), []
+
+    def at(sub: str) -> str:
+        sub = sub.strip().strip("/").removeprefix("./")
+        return "/".join(p for p in (rel_dir, sub) if p and p != ".")
+
+    roots: set[str] = set()
+    names: list[tuple[str, str]] = []
+    m = re.search(r'(?ms)^\[tool\.setuptools\.package-dir\][^\[]*?^\s*""\s*=\s*"([^"]*)"', text)
+    default_root = at(m.group(1)) if m else rel_dir
+    roots.add(default_root)
+    for m in re.finditer(r'(?m)^\s*where\s*=\s*\[([^\]]*)\]', text):
+        roots.update(at(w) for w in re.findall(r'"([^"]+)"', m.group(1)))
+    for m in re.finditer(r'\{[^}]*\binclude\s*=\s*"([^"]+)"[^}]*\}', text):
+        frm = re.search(r'\bfrom\s*=\s*"([^"]+)"', m.group(0))
+        base = at(frm.group(1)) if frm else rel_dir
+        roots.add(base)
+        names.append((base, m.group(1).replace("/", ".")))
+    for m in re.finditer(r'(?m)^\s*packages\s*=\s*\[([^\]{]*)\]', text):
+        for item in re.findall(r'"([^"]+)"', m.group(1)):
+            if "/" in item:  # hatch: a directory path
+                base, _, name = at(item).rpartition("/")
+                roots.add(base)
+                names.append((base, name))
+            else:
+                names.append((default_root, item))
+    return roots, names
+
+
+def _top_package(d: str, init_dirs: set[str]) -> int:
+    """Index into d's parts where its outermost enclosing package starts."""
+    parts = d.split("/")
+    top = len(parts) - 1
+    while top > 0 and "/".join(parts[:top]) in init_dirs:
+        top -= 1
+    return top
+
+
+def python_roots(init_dirs: set[str], manifests: list[tuple[Path, str]], root: Path,
+                 tree: LocalTree = LOCAL) -> tuple[set[str], list[tuple[str, str]]]:
+    """(sys.path roots, [(root, dotted package name)] declared in pyprojects).
+    Roots are the repo root, the parent of every topmost package dir (so
+    src-layouts resolve) and whatever pyproject.toml declares."""
+    roots: set[str] = {""}
+    for d in init_dirs:
+        roots.add("/".join(d.split("/")[:_top_package(d, init_dirs)]))
+    declared: list[tuple[str, str]] = []
+    for path, name in manifests:
+        if name != "pyproject.toml":
             continue
-        try:
-            txt = cargo.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
+        rel_dir = path.relative_to(root).parent.as_posix()
+        declared_roots, names = _pyproject_packages(path, "" if rel_dir == "." else rel_dir,
+                                                    tree)
+        roots |= declared_roots
+        declared += names
+    return roots, declared
+
+
+def python_index(init_dirs: set[str], py_files: list[str],
+                 manifests: list[tuple[Path, str]], root: Path,
+                 tree: LocalTree = LOCAL) -> dict[str, str]:
+    """Dotted Python import name -> module key, built once from the enumeration.
+
+    Sources: every regular package (a dir with __init__.py) under its sys.path
+    root (see `python_roots`) and also under the repo root (PEP 420 namespace
+    style, `import src.app`); packages declared in pyproject.toml; and
+    single-file modules sitting directly in a known root. Absolute imports then
+    resolve with a few dict lookups (longest dotted prefix) in _resolve_python."""
+    index: dict[str, str] = {}
+    roots, declared = python_roots(init_dirs, manifests, root, tree)
+
+    def add(dotted: tuple[str, ...], dir_rel: str) -> None:
+        if dotted and all(dotted):
+            index.setdefault(".".join(dotted), module_key(tuple(dir_rel.split("/"))
+                                                          if dir_rel else ()))
+
+    for d in sorted(init_dirs):
+        parts = d.split("/")
+        add(tuple(parts[_top_package(d, init_dirs):]), d)
+        add(tuple(parts), d)
+    for base, dotted in declared:
+        add(tuple(dotted.split(".")), "/".join(p for p in (base, *dotted.split(".")) if p))
+    for f in py_files:
+        d, _, fn = f.rpartition("/")
+        if d in roots:
+            add((fn[:-3],), d)
+    return index
+
+
+class PrefixTrie:
+    """Longest-prefix map over strings (a character trie of dicts).
+
+    `insert(prefix, value)` registers a plain prefix (`@app/` from `@app/*`);
+    `segment=True` only matches at a path-segment boundary (package `@acme/ui`
+    matches `@acme/ui` and `@acme/ui/x`, not `@acme/uix`); `exact=True` matches
+    the whole string only. Lookup cost is the length of the import string,
+    independent of how many aliases/packages are registered."""
+
+    _END = "\0"
+
+    def __init__(self):
+        self.root: dict = {}
+
+    def insert(self, prefix: str, value: str, *, segment: bool = False,
+               exact: bool = False) -> None:
+        node = self.root
+        for ch in prefix:
+            node = node.setdefault(ch, {})
+        node.setdefault(self._END, (value, segment, exact))
+
+    def longest(self, s: str) -> tuple[int, str] | None:
+        """(matched length, value) of the longest registered prefix of `s`."""
+        best, node = None, self.root
+        for i in range(len(s) + 1):
+            hit = node.get(self._END)
+            if hit is not None:
+                value, segment, exact = hit
+                if (i == len(s) or (not exact and (not segment or s[i] == "/"))):
+                    best = (i, value)
+            if i == len(s):
+                break
+            node = node.get(s[i])
+            if node is None:
+                break
+        return best
+
+    def __bool__(self) -> bool:
+        return bool(self.root)
+
+
+def _load_jsonc(path: Path, tree: LocalTree = LOCAL) -> dict | None:
+    """json.loads for tsconfig-style JSONC: // and /* */ comments and trailing
+    commas are stripped (outside strings) first."""
+    try:
+        text = tree.read_text(path)
+    except OSError:
+        return None
+    out, i, n, in_str = [], 0, len(text), False
+    while i < n:
+        c = text[i]
+        if in_str:
+            out.append(c)
+            if c == "\\" and i + 1 < n:
+                out.append(text[i + 1])
+                i += 1
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+            out.append(c)
+        elif text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j == -1 else j
+            continue
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            i = n if j == -1 else j + 2
+            continue
+        else:
+            out.append(c)
+        i += 1
+    try:
+        data = json.loads(re.sub(r",(\s*[}\]])", r"\1", "".join(out)))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _ts_paths(path: Path, seen: set[str], tree: LocalTree = LOCAL
+              ) -> tuple[dict, str | None, str]:
+    """Effective (paths, baseUrl dir, dir of the config defining paths) for a
+    tsconfig/jsconfig after following its relative `extends` chain (string or
+    array; package-provided bases live in node_modules and are not followed)."""
+    seen.add(str(path))
+    data = _load_jsonc(path, tree) or {}
+    paths, base_url, paths_dir = {}, None, str(path.parent)
+    ext = data.get("extends")
+    for e in ([ext] if isinstance(ext, str) else ext if isinstance(ext, list) else []):
+        if not isinstance(e, str) or not e.startswith("."):
+            continue
+        parent = Path(os.path.normpath(path.parent / e))
+        if parent.suffix != ".json":
+            parent = parent.with_name(parent.name + ".json")
+        if str(parent) in seen or not tree.is_file(parent):
+            continue
+        p_paths, p_base, p_dir = _ts_paths(parent, seen, tree)
+        if p_paths:
+            paths, paths_dir = p_paths, p_dir
+        base_url = p_base or base_url
+    opts = data.get("compilerOptions") or {}
+    if isinstance(opts.get("baseUrl"), str):
+        base_url = os.path.normpath(path.parent / opts["baseUrl"])
+    if isinstance(opts.get("paths"), dict):
+        paths, paths_dir = opts["paths"], str(path.parent)
+    return paths, base_url, paths_dir
+
+
+def ts_alias_scopes(root: Path, manifests: list[tuple[Path, str]],
+                    tree: LocalTree = LOCAL) -> dict[str, PrefixTrie]:
+    """Config dir (root-relative posix, "" for the root) -> PrefixTrie of its
+    `compilerOptions.paths` aliases, each mapped to a root-relative target
+    prefix. Built once per scan; an import resolves against the trie of the
+    nearest enclosing tsconfig/jsconfig. Every config gets a scope, an empty
+    trie when it has no `paths` of its own or through `extends`, so a parent
+    config's aliases never reach files a nearer config owns (as in tsc)."""
+    scopes: dict[str, PrefixTrie] = {}
+    root_s = str(root)
+    for path, name in manifests:
+        if name not in ("tsconfig.json", "jsconfig.json"):
+            continue
+        paths, base_url, paths_dir = _ts_paths(path, set(), tree)
+        base = base_url or paths_dir
+        trie = PrefixTrie()
+        for alias, targets in paths.items():
+            if not isinstance(targets, list) or not targets or not isinstance(targets[0], str):
+                continue
+            target = os.path.normpath(os.path.join(base, targets[0]))
+            rel = os.path.relpath(target, root_s).replace(os.sep, "/")
+            if rel == ".." or rel.startswith("../"):
+                continue  # alias into something outside the scanned tree
+            if "*" in alias:
+                prefix = alias.split("*", 1)[0]
+                if prefix:  # a bare "*" catch-all would swallow every package
+                    star = rel.split("*", 1)[0] if "*" in targets[0] else rel + "/"
+                    trie.insert(prefix, star)
+            else:
+                trie.insert(alias, rel, exact=True)
+        d = path.parent.relative_to(root).as_posix()
+        d = "" if d == "." else d
+        if not scopes.get(d):  # a tsconfig.json and jsconfig.json side by side: the one with paths
+            scopes[d] = trie
+    return scopes
+
+
+def _glob_match(path: str, glob: str) -> bool:
+    """Whether root-relative `path` matches a workspace glob, segment by
+    segment: `*`, `?` and `[...]` stay within one path segment and only `**`
+    spans directories (`packages/*` matches `packages/ui`, not
+    `packages/ui/fixtures`)."""
+    def match(parts: list[str], pats: list[str]) -> bool:
+        if not pats:
+            return not parts
+        if pats[0] == "**":
+            return any(match(parts[i:], pats[1:]) for i in range(len(parts) + 1))
+        return bool(parts) and fnmatch.fnmatchcase(parts[0], pats[0]) \
+            and match(parts[1:], pats[1:])
+
+    pats = [p for p in glob.split("/") if p not in ("", ".")]
+    return match(path.split("/"), pats)
+
+
+def workspace_packages(root: Path, manifests: list[tuple[Path, str]],
+                       tree: LocalTree = LOCAL) -> PrefixTrie:
+    """PrefixTrie of JS workspace member package names -> package dir, from the
+    root package.json `workspaces` (array or {packages}) and pnpm-workspace.yaml
+    globs matched against the package.json files the enumeration found —
+    no filesystem probing. Matches whole segments, so scoped names and deep
+    imports (`@acme/ui/button`) resolve."""
+    globs: list[str] = []
+    for path, name in manifests:
+        if path.parent != root:
+            continue
+        if name == "package.json":
+            try:
+                ws = json.loads(tree.read_text(path)).get("workspaces")
+            except Exception:
+                ws = None
+            if isinstance(ws, dict):
+                ws = ws.get("packages")
+            if isinstance(ws, list):
+                globs += [g for g in ws if isinstance(g, str)]
+        elif name == "pnpm-workspace.yaml":
+            try:
+                text = tree.read_text(path)
+            except OSError:
+                continue
+            block = re.search(r"(?ms)^packages:\s*\n((?:\s+-.*\n?)+)", text)
+            if block:
+                globs += [g.strip().strip("'\"") for g in re.findall(r"-\s*(.+)", block.group(1))]
+    include = [g.rstrip("/") for g in globs if not g.startswith("!")]
+    exclude = [g[1:].rstrip("/") for g in globs if g.startswith("!")]
+    trie = PrefixTrie()
+    if not include:
+        return trie
+    for path, name in manifests:
+        if name != "package.json" or path.parent == root:
+            continue
+        d = path.parent.relative_to(root).as_posix()
+        if not any(_glob_match(d, g) for g in include) or \
+                any(_glob_match(d, g) for g in exclude):
             continue
-        m = re.search(r'(?ms)^\[package\][^\[]*?^\s*name\s*=\s*"([^"]+)"', txt)
-        if m:
-            add(m.group(1), rel.parts[:-1])
-    for pkg in root.rglob("package.json"):
-        rel = pkg.relative_to(root)
-        if is_pruned(rel.parts[:-1]) or len(rel.parts) == 1:
-            continue  # root package.json isn't an internal sibling
         try:
-            data = json.loads(pkg.read_text(encoding="utf-8", errors="ignore"))
-            if isinstance(data.get("name"), str):
-                add(data["name"], rel.parts[:-1])
+            pkg = json.loads(tree.read_text(path)).get("name")
         except Exception:
-            pass
-    return reg
+            continue
+        if isinstance(pkg, str) and pkg:
+            trie.insert(pkg, d, segment=True)
+    return trie
 
 
 ENTRY_NAMES = {
@@ -201,122 +827,744 @@ ENTRY_NAMES = {
 }
 
 
-def scan(root: Path, max_files: int) -> dict:
-    stack, declared = detect_stack(root)
-    reg = internal_packages(root)
-    files: list[Path] = []
-    lang_count: dict[str, int] = defaultdict(int)
-    modules: dict[str, dict] = {}
-    edges: dict[tuple[str, str], int] = defaultdict(int)
-    external: dict[str, int] = defaultdict(int)
-    file_to_module: dict[str, str] = {}
-    source_roots: set[str] = set()
-
-    # First pass: collect source files + module buckets.
-    all_paths: list[Path] = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        rel = Path(dirpath).relative_to(root)
-        if is_pruned(rel.parts):
-            dirnames[:] = []
-            continue
-        dirnames[:] = [d for d in dirnames if d not in PRUNE]
-        for fn in filenames:
-            ext = os.path.splitext(fn)[1].lower()
-            if ext in EXT_TO_LANG:
-                all_paths.append(Path(dirpath, fn))
-
-    truncated = len(all_paths) > max_files
-    for p in all_paths[:max_files]:
-        rel = p.relative_to(root)
-        lang = EXT_TO_LANG[p.suffix.lower()]
-        lang_count[lang] += 1
-        if rel.parts:
-            source_roots.add(rel.parts[0])
-        mod = module_of(rel, source_roots)
-        file_to_module[rel.as_posix()] = mod
-        m = modules.setdefault(mod, {"path": mod, "files": 0, "loc": 0, "langs": set()})
-        m["files"] += 1
-        m["langs"].add(lang)
-        files.append(p)
-
-    # Second pass: imports → edges.
-    for p in files:
-        rel = p.relative_to(root)
-        mod = file_to_module[rel.as_posix()]
-        lang = EXT_TO_LANG[p.suffix.lower()]
+# --------------------------------------------------------------------------- #
+# per-file scan cache
+# --------------------------------------------------------------------------- #
+CACHE_VERSION = 6
+
+
+def _extractor_signature(guard: tuple[int, bool]) -> str:
+    """Fingerprint of the extraction rules: editing LANGS or changing the guard
+    settings invalidates the cache."""
+    h = hashlib.sha1(repr((CACHE_VERSION, guard)).encode())
+    for name in sorted(LANGS):
+        spec = LANGS[name]
+        h.update(name.encode())
+        for rx in (*spec.get("imports", ()), spec["header_end"]):
+            if rx is not None:
+                h.update(repr((rx.pattern, rx.flags)).encode())
+        if "parse" in spec:
+            h.update(spec["parse"].__name__.encode())
+        for rx in SYMBOLS.get(name, ()):
+            h.update(repr((rx.pattern, rx.flags)).encode())
+    h.update(TS_EXPORT_LIST.pattern)
+    return h.hexdigest()
+
+
+def cache_path(root: Path) -> Path:
+    """Cache file for `root`: $REPO_MAP_CACHE_DIR, else ~/.cache/repo-map, one
+    sqlite file per scanned root (never inside the repo, so it is not mapped or
+    committed)."""
+    base = os.environ.get("REPO_MAP_CACHE_DIR")
+    d = Path(base).expanduser() if base else Path.home() / ".cache" / "repo-map"
+    digest = hashlib.sha1(os.path.normcase(str(root)).encode("utf-8")).hexdigest()[:16]
+    return d / f"{digest}.sqlite"
+
+
+class ScanCache:
+    """Per-file records keyed by (path, size, mtime_ns, inode).
+
+    A record holds what is expensive to recompute — language, LOC, the raw
+    (unresolved) import targets, the guard's skip reason, if any, and the
+    file's symbols once a --symbols scan has extracted them (NULL until then,
+    which a --symbols scan treats as a miss). Resolution to module keys depends on the whole
+    tree (source roots, workspace packages), so it is redone on every scan from
+    the records. The table is read once when the cache opens and written once
+    on close: records for new or changed files are inserted, and rows for files
+    not seen by the current scan are pruned. Any sqlite error disables the cache
+    for the rest of the run."""
+
+    def __init__(self, path: Path, rebuild: bool = False,
+                 guard: tuple[int, bool] = (MAX_BYTES, True)):
+        self.path = path
+        self.hits = self.misses = 0
+        self.db = None
+        self.enabled = False
+        self.rows: dict[str, tuple] = {}
+        self.seen: set[str] = set()
+        self.pending: list[tuple] = []
+        if sqlite3 is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(path), timeout=5)
+            signature = _extractor_signature(guard)
+            db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+            meta = dict(db.execute("SELECT k, v FROM meta"))
+            if rebuild or meta.get("signature") != signature:
+                db.execute("DROP TABLE IF EXISTS files")  # schema may differ too
+            db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, "
+                       "size INTEGER, mtime INTEGER, ino INTEGER, "
+                       "lang TEXT, loc INTEGER, targets TEXT, skip TEXT, symbols TEXT)")
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature,))
+            self.rows = {row[0]: row[1:] for row in db.execute(
+                "SELECT path, size, mtime, ino, lang, loc, targets, skip, symbols FROM files")}
+            self.db = db
+            self.enabled = True
+        except Exception:
+            self.db = None
+
+    def get(self, rel: str, st: os.stat_result, symbols: bool = False):
+        """(lang, loc, targets, skip, symbols) when the stored key matches `st`
+        (and, if `symbols` is asked for, they were stored), else None."""
+        if self.db is None:
+            return None
+        row = self.rows.get(rel)
+        if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ino) \
+                and not (symbols and row[7] is None):
+            try:
+                hit = (row[3], row[4], json.loads(row[5]), row[6],
+                       None if row[7] is None else json.loads(row[7]))
+            except ValueError:
+                hit = None
+            if hit is not None:
+                self.seen.add(rel)
+                self.hits += 1
+                return hit
+        self.misses += 1
+        return None
+
+    def put(self, rel: str, st: os.stat_result, lang: str, loc: int,
+            targets: list[str], skip: str | None = None,
+            symbols: list[str] | None = None) -> None:
+        if self.db is None:
+            return
+        self.seen.add(rel)
+        self.pending.append(
+            (rel, st.st_size, st.st_mtime_ns, st.st_ino, lang, loc,
+             json.dumps(targets, ensure_ascii=False), skip,
+             None if symbols is None else json.dumps(symbols, ensure_ascii=False)))
+
+    def close(self) -> None:
+        if self.db is None:
+            return
         try:
-            text = p.read_text(encoding="utf-8", errors="ignore")
+            self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                self.pending)
+            self.db.executemany("DELETE FROM files WHERE path = ?",
+                                ((rel,) for rel in self.rows.keys() - self.seen))
+            self.db.commit()
+            self.db.close()
         except Exception:
+            pass
+        self.db = None
+        self.rows, self.seen, self.pending = {}, set(), []
+
+    def report(self) -> dict:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses}
+
+
+def _skip_by_stat(rel: str, size: int, guard: tuple[int, bool]) -> str | None:
+    """Skip reason decidable without opening the file (name, size)."""
+    max_bytes, enabled = guard
+    if not enabled:
+        return None
+    if ".min." in rel.rsplit("/", 1)[-1]:
+        return "minified"
+    if max_bytes and size > max_bytes:
+        return "too-large"
+    return None
+
+
+def _skip_by_sample(sample: bytes) -> str | None:
+    """Skip reason from the first block: a generated header, minified lines."""
+    lines = sample.split(b"\n")
+    comments = 0
+    for line in lines:
+        line = line.rstrip(b"\r")
+        if not line.strip() or (line.startswith(b"#!") and not comments):
+            continue
+        if GO_GENERATED.match(line):
+            return "generated"
+        if not HEADER_COMMENT.match(line):
+            break
+        if comments < HEADER_LINES and b"@generated" in line:
+            return "generated"
+        comments += 1
+    if max(map(len, lines)) > MAX_LINE:
+        return "minified"
+    return None
+
+
+READ_CHUNK = 1 << 16
+
+
+def _read_region(f, first: bytes, header_end: re.Pattern | None) -> tuple[bytes, int]:
+    """Read the rest of `f` in chunks. Returns (import region, newline count).
+
+    The region is everything before the first line matching `header_end` (the
+    whole file when it is None); once that line is seen, later chunks are only
+    newline-counted and dropped. Only complete lines are searched, so a match
+    is never decided on a line cut at a chunk boundary."""
+    parts, newlines, pos = [first], first.count(b"\n"), 0
+    region = None
+    buf = first
+    while True:
+        chunk = f.read(READ_CHUNK)
+        if region is None and header_end is not None:
+            end = len(buf) if not chunk else buf.rfind(b"\n") + 1
+            m = header_end.search(buf, pos, end)
+            if m:
+                region, buf = buf[:m.start()], b""
+            else:
+                pos = end
+        if not chunk:
+            break
+        newlines += chunk.count(b"\n")
+        if region is None:
+            if header_end is None:
+                parts.append(chunk)
+            else:
+                buf += chunk
+    if region is None:
+        region = b"".join(parts) if header_end is None else buf
+    return region, newlines
+
+
+def _extract(path: str, lang: str, guard: tuple[int, bool], symbols: bool = False
+             ) -> tuple[int, list[str], str | None, list[str] | None] | None:
+    """(LOC, raw import targets, skip reason, symbols) of one source file, or
+    None if unreadable. See `extract_from`; symbols are None unless asked for,
+    and then need the whole file in memory (it is under the guard's size cap)."""
+    try:
+        with open(path, "rb") as f:
+            if not symbols:
+                return (*extract_from(f, lang, guard), None)
+            data = f.read()
+        loc, targets, skip = extract_from(io.BytesIO(data), lang, guard)
+    except Exception:
+        return None
+    return loc, targets, skip, [] if skip else extract_symbols(data, lang)
+
+
+def extract_symbols(data: bytes, lang: str) -> list[str]:
+    """Top-level public symbols of a source file as "kind name" strings, in
+    file order, capped at SYMBOL_CAP (see SYMBOLS)."""
+    found: list[tuple[int, str, str]] = []
+    if lang == "python":
+        try:
+            body = ast.parse(data).body
+        except (SyntaxError, ValueError):
+            body = None
+        if body is not None:
+            for node in body:
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    kind = "class" if isinstance(node, ast.ClassDef) else "def"
+                    found.append((node.lineno, kind, node.name))
+            return _dedupe(f"{k} {n}" for _, k, n in found
+                           if not n.startswith("_"))[:SYMBOL_CAP]
+    for rx in SYMBOLS.get(lang, ()):
+        found += [(m.start(), m.group(1).decode(), m.group(2).decode("utf-8", "ignore"))
+                  for m in rx.finditer(data)]
+    if lang == "ts/js":
+        for m in TS_EXPORT_LIST.finditer(data):
+            for item in m.group(1).decode("utf-8", "ignore").split(","):
+                name = item.split(" as ")[-1].strip()
+                if name and name != "default":
+                    found.append((m.start(), "export", name))
+    found.sort(key=lambda t: t[0])
+    return _dedupe(f"{k} {n}" for _, k, n in found if not n.startswith("_"))[:SYMBOL_CAP]
+
+
+def extract_from(f, lang: str, guard: tuple[int, bool]) -> tuple[int, list[str], str | None]:
+    """(LOC, raw import targets, skip reason) from a binary stream — a file or,
+    for the git-object backends, a blob. Works on bytes: only the language's
+    import region is regexed (see LANGS) and LOC is a newline count over the raw
+    chunks. A stream the guard rejects on its first block is not read further
+    and yields (0, [], reason)."""
+    spec = LANGS[lang]
+    sample = f.read(SAMPLE_BYTES)
+    if guard[1]:
+        reason = _skip_by_sample(sample)
+        if reason:
+            return 0, [], reason
+    region, newlines = _read_region(f, sample, spec["header_end"])
+    if "parse" in spec:
+        found = spec["parse"](region)
+    else:
+        found = [m for rx in spec["imports"] for m in rx.findall(region)]
+    return newlines + 1, [t.decode("utf-8", errors="ignore") for t in found], None
+
+
+def _extract_chunk(chunk: list[tuple[str, str, str]], guard: tuple[int, bool],
+                   symbols: bool = False) -> list[tuple | None]:
+    """Worker entry point: [(path, lang, module)] ->
+    [(module, loc, targets, skip, symbols) | None]."""
+    out = []
+    for path, lang, mod in chunk:
+        extracted = _extract(path, lang, guard, symbols)
+        out.append(None if extracted is None else (mod, *extracted))
+    return out
+
+
+def _batched(it: Iterable, n: int) -> Iterator[list]:
+    it = iter(it)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+def _records(root: Path, sources: Iterable[tuple[str, str]], cache: ScanCache | None,
+             jobs: int, guard: tuple[int, bool] = (MAX_BYTES, True), pool=None,
+             symbols: dict[str, list[str]] | None = None
+             ) -> Iterator[tuple[str, str, str, int, list[str], str | None]]:
+    """Stage 2 of the pipeline: (rel, lang) -> (rel, module, lang, loc, raw targets,
+    skip reason), in input order. Works through a bounded window of files at a
+    time: cache hits and files the guard rejects by name/size are answered in
+    place, the rest are extracted serially or — with jobs > 1 — in ordered
+    chunks on a process pool, so memory stays flat and the output is identical
+    to a serial run. Unreadable files yield loc 0 and no targets. A caller
+    scanning many trees passes its own `pool`, which is left running. With a
+    `symbols` dict, each file's symbols are extracted too (or taken from the
+    cache) and stored in it under the file's path when there are any."""
+    want_symbols = symbols is not None
+    window = 256 if jobs <= 1 else jobs * 64
+    ex = pool
+    try:
+        for batch in _batched(sources, window):
+            slots: list = []
+            misses: list[tuple[int, os.stat_result]] = []
+            for rel, lang in batch:
+                mod = module_key(tuple(rel.split("/")[:-1]))
+                path = os.path.join(root, rel)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    slots.append((rel, mod, lang, 0, [], None))
+                    continue
+                skip = _skip_by_stat(rel, st.st_size, guard)
+                cached = cache.get(rel, st, want_symbols) if cache and not skip else None
+                if skip:
+                    slots.append((rel, mod, lang, 0, [], skip))
+                elif cached is not None:
+                    slots.append((rel, mod, lang, *cached[1:4]))
+                    if want_symbols and cached[4]:
+                        symbols[rel] = cached[4]
+                else:
+                    misses.append((len(slots), st))
+                    slots.append((path, lang, mod))
+            items = [slots[i] for i, _ in misses]
+            if jobs > 1 and len(items) > 1:
+                if ex is None:
+                    from concurrent.futures import ProcessPoolExecutor
+                    ex = ProcessPoolExecutor(max_workers=jobs)
+                size = max(1, -(-len(items) // jobs))
+                chunks = [items[k:k + size] for k in range(0, len(items), size)]
+                extracted = [r for part in ex.map(_extract_chunk, chunks, repeat(guard),
+                                                  repeat(want_symbols))
+                             for r in part]
+            else:
+                extracted = _extract_chunk(items, guard, want_symbols)
+            for (i, st), res in zip(misses, extracted):
+                rel, (_, lang, mod) = batch[i][0], slots[i]
+                if res is None:
+                    slots[i] = (rel, mod, lang, 0, [], None)
+                    continue
+                _, loc, targets, skip, syms = res
+                if cache:
+                    cache.put(rel, st, lang, loc, targets, skip, syms)
+                if syms:
+                    symbols[rel] = syms
+                slots[i] = (rel, mod, lang, loc, targets, skip)
+            yield from slots
+    finally:
+        if ex is not None and ex is not pool:
+            ex.shutdown()
+
+
+def _sources(rels: Iterable[str], root: Path, manifests: list[tuple[Path, str]],
+             state: dict, max_files: int) -> Iterator[tuple[str, str]]:
+    """(rel, lang) for the source files among `rels`, up to `max_files`.
+    Manifests are collected into `manifests` on the way past; `state` counts
+    files and records truncation."""
+    for rel in rels:
+        fn = rel.rsplit("/", 1)[-1]
+        if fn in MANIFESTS:
+            manifests.append((Path(root, rel), fn))
+        lang = EXT_TO_LANG.get(os.path.splitext(fn)[1].lower())
+        if lang is None:
             continue
-        modules[mod]["loc"] += text.count("\n") + 1
-        for rx in LANGS[lang]["imports"]:
-            for mm in rx.findall(text):
-                target = mm if isinstance(mm, str) else mm[0]
-                resolved = _resolve(target, rel, root, source_roots, reg)
+        if state["files"] >= max_files:
+            state["truncated"] = True  # keep listing: manifests still count
+            continue
+        state["files"] += 1
+        yield rel, lang
+
+
+def _bump(counts: dict, key, n: int) -> None:
+    counts[key] = counts.get(key, 0) + n
+    if not counts[key]:
+        del counts[key]
+
+
+class Skeleton:
+    """Running aggregates of a scan, fed one per-file record at a time.
+
+    Only aggregates are held — per-module counters, module->module edge weights,
+    and (importer dir, lang, bare import) counts whose resolution waits for the
+    manifests (workspace package names, source roots) the same stream discovers.
+    `add(..., sign=-1)` retracts a record, so a long-lived holder (the --serve
+    daemon) applies per-file deltas instead of rescanning; `result()` never
+    mutates the aggregates."""
+
+    def __init__(self, root: Path, resolver: RelativeResolver | None = None):
+        self.root = root
+        self.resolver = resolver or RelativeResolver(root)
+        self.lang_count: dict[str, int] = {}
+        self.modules: dict[str, dict] = {}   # key -> {path, files, loc, langs: {lang: n}}
+        self.edges: dict[tuple[str, str], int] = {}
+        self.external: dict[str, int] = {}
+        self.bare: dict[tuple[str, str, str], int] = {}  # (importer dir, lang, target)
+        self.source_roots: dict[str, int] = {}
+        self.init_dirs: set[str] = set()   # Python package dirs (hold __init__.py)
+        self.py_files: set[str] = set()    # shallow .py files: candidate top-level modules
+        self.entries: set[str] = set()
+        self.skipped: dict[str, str] = {}
+
+    def add(self, rel: str, mod: str, lang: str, loc: int, targets: list[str],
+            skip: str | None, sign: int = 1) -> None:
+        self.place(rel, mod, lang, sign)
+        self.absorb(rel, mod, lang, loc, targets, skip, sign)
+
+    def place(self, rel: str, mod: str, lang: str, sign: int = 1) -> None:
+        """The path-only half of `add`: file counts, languages, entry points and
+        the context bare imports resolve against (source roots, Python packages)."""
+        parts = rel.split("/")
+        _bump(self.source_roots, parts[0], sign)
+        _bump(self.lang_count, lang, sign)
+        m = self.modules.get(mod)
+        if m is None:
+            m = self.modules[mod] = {"path": mod, "files": 0, "loc": 0, "langs": {}}
+        m["files"] += sign
+        _bump(m["langs"], lang, sign)
+        if not m["files"]:
+            del self.modules[mod]
+        # Entry points: any file with an entry name that sits at a source root
+        # (depth <= 3), so nested crates/apps are caught.
+        marks = []
+        if parts[-1] in ENTRY_NAMES and len(parts) <= 4:
+            marks.append(self.entries)
+        if lang == "python":
+            if parts[-1] == "__init__.py":
+                (self.init_dirs.add if sign > 0 else self.init_dirs.discard)("/".join(parts[:-1]))
+            elif len(parts) <= 4:
+                marks.append(self.py_files)
+        for marked in marks:
+            (marked.add if sign > 0 else marked.discard)(rel)
+
+    def absorb(self, rel: str, mod: str, lang: str, loc: int, targets: list[str],
+               skip: str | None, sign: int = 1) -> None:
+        """The content half of `add`: LOC, skip reason and import targets."""
+        if mod in self.modules:
+            self.modules[mod]["loc"] += sign * loc
+        if skip:
+            if sign > 0:
+                self.skipped[rel] = skip
+            else:
+                self.skipped.pop(rel, None)
+        importer_dir = rel.rpartition("/")[0]
+        for target in targets:
+            if lang == "python" and target.startswith("."):
+                target = _py_relative(target)
+            if target.startswith("."):
+                resolved = self.resolver.resolve(importer_dir, target)
                 if resolved is None:
-                    external[_external_name(target)] += 1
+                    _bump(self.external, _external_name(target), sign)
                 elif resolved != mod:
-                    edges[(mod, resolved)] += 1
-
-    for m in modules.values():
-        m["langs"] = sorted(m["langs"])
-
-    # Entry points: root-relative hints + any discovered file with an entry name
-    # that sits at a source root (depth <= 3), so nested crates/apps are caught.
-    entries = []
-    for hint in ENTRY_HINTS:
-        if (root / hint).exists():
-            entries.append(hint)
-    for p in files:
-        rel = p.relative_to(root)
-        if p.name in ENTRY_NAMES and len(rel.parts) <= 4:
-            entries.append(rel.as_posix())
-    # manifest-declared bin/main (package.json)
-    pkg = root / "package.json"
-    if pkg.exists():
+                    _bump(self.edges, (mod, resolved), sign)
+            else:
+                _bump(self.bare, (importer_dir, lang, target), sign)
+
+    def graph(self, manifests: list[tuple[Path, str]], tree: LocalTree = LOCAL
+              ) -> tuple[dict[tuple[str, str], int], dict[str, int]]:
+        """(module edge weights, external use counts) with the pending bare
+        imports resolved against `manifests` and the source roots seen so far."""
+        root = self.root
+        edges = dict(self.edges)
+        external = dict(self.external)
+        reg = internal_packages(root, manifests, tree)
+        pyindex = python_index(self.init_dirs, sorted(self.py_files), manifests, root, tree)
+        aliases = ts_alias_scopes(root, manifests, tree)
+        workspaces = workspace_packages(root, manifests, tree)
+        for (importer_dir, lang, target), n in self.bare.items():
+            mod = module_key(tuple(importer_dir.split("/")) if importer_dir else ())
+            resolved = None
+            if lang == "python":
+                resolved = _resolve_python(target, pyindex)
+            elif lang == "ts/js":
+                resolved = _resolve_ts(target, importer_dir, aliases, workspaces)
+            if resolved is None:
+                resolved = _resolve_bare(target, self.source_roots, reg)
+            if resolved is None:
+                _bump(external, _external_name(target), n)
+            elif resolved != mod:
+                _bump(edges, (mod, resolved), n)
+        return edges, external
+
+    def entrypoints(self, tree: LocalTree = LOCAL) -> list[str]:
+        """Root-relative hints first, then discovered entry files, then the
+        package.json main/bin."""
+        root = self.root
+        entries = [h for h in ENTRY_HINTS if tree.exists(root / h)] + sorted(self.entries)
+        pkg = root / "package.json"
+        if tree.exists(pkg):
+            try:
+                data = json.loads(tree.read_text(pkg))
+                if isinstance(data.get("main"), str):
+                    entries.append(data["main"])
+                b = data.get("bin")
+                if isinstance(b, str):
+                    entries.append(b)
+                elif isinstance(b, dict):
+                    entries += list(b.values())
+            except Exception:
+                pass
+        return _dedupe(entries)
+
+    def result(self, manifests: list[tuple[Path, str]], file_count: int, truncated: bool,
+               enum: dict, cache: dict, tree: LocalTree = LOCAL) -> dict:
+        """The JSON skeleton."""
+        root = self.root
+        stack, declared = detect_stack(manifests, tree)
+        edges, external = self.graph(manifests, tree)
+        entries = self.entrypoints(tree)
+
+        # Ties break by name so the output is stable whatever the file order.
+        top_external = sorted(external.items(), key=lambda kv: (-kv[1], kv[0]))[:25]
+        edge_list = [{"from": a, "to": b, "weight": w}
+                     for (a, b), w in sorted(edges.items(), key=lambda kv: (-kv[1], kv[0]))]
+        modules = [module_record(m) for m in self.modules.values()]
+        skipped = [{"path": p, "reason": self.skipped[p]} for p in sorted(self.skipped)]
+
+        return {
+            "root": str(root),
+            "stack": stack,
+            "languages": dict(sorted(self.lang_count.items(), key=lambda kv: (-kv[1], kv[0]))),
+            "entrypoints": entries,
+            "module_count": len(modules),
+            "file_count": file_count,
+            "truncated": truncated,
+            "fingerprint": structure_fingerprint(root, self.modules, manifests, entries, tree),
+            "modules": sorted(modules, key=lambda m: (-m["files"], m["path"])),
+            "internal_edges": edge_list,
+            "graph": graph.analyze(list(self.modules), edges),
+            "declared_dependencies": declared[:50],
+            "observed_external": [{"name": n, "uses": c} for n, c in top_external],
+            "skipped": {"count": len(skipped), "files": skipped[:SKIPPED_CAP]},
+            "enumeration": {**enum, "ms": round(enum["ms"], 1)},
+            "cache": cache,
+        }
+
+
+def module_record(m: dict) -> dict:
+    """A module aggregate as emitted: langs collapse to a sorted name list."""
+    return {"path": m["path"], "files": m["files"], "loc": m["loc"], "langs": sorted(m["langs"])}
+
+
+def fold(sk: Skeleton, records: Iterable[tuple[str, str, str, int, list[str], str | None]],
+         emit: Callable[[dict], None] | None = None) -> None:
+    """Stage 3 of the pipeline: add each (rel, module, lang, loc, targets, skip)
+    record to `sk`. Paths arrive grouped by top-level directory, so a module is
+    final once the stream leaves its top-level dir; `emit`, when given,
+    receives each module record at that point (the NDJSON mode)."""
+    open_top, open_mods = None, []
+
+    def flush(mods: list[str]) -> None:
+        for key in sorted(mods):
+            emit({"type": "module", **module_record(sk.modules[key])})
+
+    for rel, mod, lang, loc, targets, skip in records:
+        top = rel.split("/", 1)[0] if "/" in rel else None
+        if emit and top != open_top:
+            flush([k for k in open_mods if k != "(root)"])
+            open_mods = [k for k in open_mods if k == "(root)"]
+            open_top = top
+        if mod not in sk.modules:
+            open_mods.append(mod)
+        sk.add(rel, mod, lang, loc, targets, skip)
+    if emit:
+        flush(open_mods)
+
+
+def structure_fingerprint(root: Path, modules: Iterable[str], manifests: list[tuple[Path, str]],
+                          entries: list[str], tree: LocalTree = LOCAL) -> str:
+    """Hash of what MAP.md is written from structurally: the module set, the
+    manifests (path and text) and the entry points. Source contents are not
+    part of it, so it can be computed from the listing alone."""
+    h = hashlib.sha1(b"repo-map-structure-1")
+    for mod in sorted(modules):
+        h.update(b"m\0" + mod.encode("utf-8") + b"\0")
+    for path, _ in sorted(manifests):
         try:
-            data = json.loads(pkg.read_text(encoding="utf-8", errors="ignore"))
-            if isinstance(data.get("main"), str):
-                entries.append(data["main"])
-            b = data.get("bin")
-            if isinstance(b, str):
-                entries.append(b)
-            elif isinstance(b, dict):
-                entries += list(b.values())
-        except Exception:
-            pass
+            text = tree.read_text(path)
+        except OSError:
+            text = ""
+        rel = path.relative_to(root).as_posix()
+        h.update(b"f\0" + rel.encode("utf-8") + b"\0" + text.encode("utf-8") + b"\0")
+    for entry in entries:
+        h.update(b"e\0" + str(entry).encode("utf-8") + b"\0")
+    return h.hexdigest()[:16]
 
-    top_external = sorted(external.items(), key=lambda kv: -kv[1])[:25]
-    edge_list = [{"from": a, "to": b, "weight": w}
-                 for (a, b), w in sorted(edges.items(), key=lambda kv: -kv[1])]
 
+def fingerprint(root: Path, max_files: int, enumerate_with: str = "auto") -> dict:
+    """`scan.py --fingerprint`: the structure fingerprint from the listing alone
+    (no source file is opened), compared with the stamp in the root MAP.md."""
+    enum = {"backend": None, "listed": 0, "ms": 0.0}
+    manifests: list[tuple[Path, str]] = []
+    state = {"files": 0, "truncated": False}
+    sk = Skeleton(root)
+    for rel, lang in _sources(enumerate_files(root, enumerate_with, enum), root, manifests,
+                              state, max_files):
+        sk.place(rel, module_key(tuple(rel.split("/")[:-1])), lang)
+    fp = structure_fingerprint(root, sk.modules, manifests, sk.entrypoints())
+    try:
+        m = MAP_STAMP.search((root / "MAP.md").read_text(encoding="utf-8", errors="ignore"))
+        stamped = m and m.group(1)
+    except OSError:
+        stamped = None
     return {
         "root": str(root),
-        "stack": stack,
-        "languages": dict(sorted(lang_count.items(), key=lambda kv: -kv[1])),
-        "entrypoints": _dedupe(entries),
-        "module_count": len(modules),
-        "file_count": len(files),
-        "truncated": truncated,
-        "modules": sorted(modules.values(), key=lambda m: (-m["files"], m["path"])),
-        "internal_edges": edge_list,
-        "declared_dependencies": declared[:50],
-        "observed_external": [{"name": n, "uses": c} for n, c in top_external],
+        "fingerprint": fp,
+        "stamped": stamped,
+        "map": "missing" if not stamped else "fresh" if stamped == fp else "stale",
+        "module_count": len(sk.modules),
+        "file_count": state["files"],
+        "truncated": state["truncated"],
+        "enumeration": {**enum, "ms": round(enum["ms"], 1)},
     }
 
 
-def _resolve(target: str, importer_rel: Path, root: Path,
-             source_roots: set[str], reg: dict[str, str]):
-    """Map an import target to an internal module key, or None if external."""
-    # relative import -> resolve against importer's directory
-    if target.startswith("."):
-        base = (root / importer_rel).parent
-        guess = (base / target).resolve()
-        try:
-            rel = guess.relative_to(root.resolve())
-        except Exception:
+def scan(root: Path, max_files: int, cache: ScanCache | None = None,
+         jobs: int = 1, enumerate_with: str = "auto",
+         emit: Callable[[dict], None] | None = None,
+         guard: tuple[int, bool] = (MAX_BYTES, True),
+         resolver: RelativeResolver | None = None, pool=None,
+         manifests: list[tuple[Path, str]] | None = None, symbols: bool = False) -> dict:
+    """Map `root` as a streaming pipeline: enumerate -> read/extract -> aggregate.
+
+    Records fold into a `Skeleton` as they arrive (see `fold` for `emit`).
+    `guard` is (max bytes, enabled) for the pathological-file checks; skipped
+    files still count toward their module but add no LOC or edges. `resolver`
+    maps relative imports (default: lexical); `pool` is a shared extraction
+    pool (see `_records`). `manifests`, when given, is filled with the
+    (path, name) manifests the enumeration found. `symbols` adds a `symbols`
+    section: module -> file -> its top-level public symbols (see SYMBOLS)."""
+    enum = {"backend": None, "listed": 0, "ms": 0.0}
+    manifests = [] if manifests is None else manifests
+    state = {"files": 0, "truncated": False}
+    sk = Skeleton(root, resolver)
+    sources = _sources(enumerate_files(root, enumerate_with, enum), root, manifests,
+                       state, max_files)
+    found: dict[str, list[str]] | None = {} if symbols else None
+    fold(sk, _records(root, sources, cache, jobs, guard, pool, found), emit)
+    if cache:
+        cache.close()
+
+    result = sk.result(manifests, state["files"], state["truncated"], enum,
+                       cache.report() if cache else {"enabled": False, "hits": 0, "misses": 0})
+    if found is not None:
+        grouped: dict[str, dict[str, list[str]]] = {}
+        for rel in sorted(found):
+            grouped.setdefault(module_key(tuple(rel.split("/")[:-1])), {})[rel] = found[rel]
+        result["symbols"] = dict(sorted(grouped.items()))
+    return result
+
+
+class RelativeResolver:
+    """Module key of a relative import, memoized per (importer dir, target).
+
+    Resolution is lexical by default — `posixpath.normpath` on the joined path,
+    no syscalls — which is exact unless a directory in the path is a symlink.
+    `follow_symlinks` resolves through the filesystem instead (realpath against
+    the real root). Thousands of files in one directory repeat the same few
+    targets, so the LRU memo answers most lookups; `report()` gives the split."""
+
+    def __init__(self, root: Path, follow_symlinks: bool = False, maxsize: int = 1 << 16):
+        self.root = root
+        self.follow_symlinks = follow_symlinks
+        self._real_root = os.path.realpath(root) if follow_symlinks else None
+        self.resolve = lru_cache(maxsize=maxsize)(self._resolve)
+        self.locate = lru_cache(maxsize=maxsize)(self._locate)
+
+    def _locate(self, importer_dir: str, target: str) -> str | None:
+        """Root-relative path of the target ("." for the root itself); None
+        when it points outside the root."""
+        if self.follow_symlinks:
+            real = os.path.realpath(os.path.join(self.root, importer_dir, target))
+            rel = os.path.relpath(real, self._real_root).replace(os.sep, "/")
+        else:
+            rel = posixpath.normpath(posixpath.join(importer_dir, target))
+        if rel == ".." or rel.startswith("../"):
+            return None
+        return rel
+
+    def _resolve(self, importer_dir: str, target: str) -> str | None:
+        """Module key of the target; None when it points outside the root."""
+        rel = self._locate(importer_dir, target)
+        if rel is None:
             return None
-        return module_key(rel.parts)
+        return module_key(() if rel == "." else tuple(rel.split("/")))
+
+    def report(self) -> dict:
+        info = self.resolve.cache_info()
+        calls = info.hits + info.misses
+        return {"mode": "symlinks" if self.follow_symlinks else "lexical",
+                "calls": calls, "hits": info.hits, "misses": info.misses,
+                "hit_rate": round(info.hits / calls, 3) if calls else 0.0}
+
+
+def _py_relative(target: str) -> str:
+    """Python relative import -> path form: "." -> ".", "..api.v1" -> "../api/v1"."""
+    rest = target.lstrip(".")
+    dots = len(target) - len(rest)
+    up = "./" if dots == 1 else "../" * (dots - 1)
+    return (up + rest.replace(".", "/")).rstrip("/") or "."
+
+
+def _resolve_python(target: str, pyindex: dict[str, str]) -> str | None:
+    """Module key of an absolute Python import via the longest dotted prefix
+    found in the package index (`a.b.c` -> `a.b.c`, `a.b`, `a`)."""
+    parts = target.split(".")
+    for n in range(len(parts), 0, -1):
+        key = pyindex.get(".".join(parts[:n]))
+        if key is not None:
+            return key
+    return None
+
+
+def _ts_path(target: str, importer_dir: str, aliases: dict[str, PrefixTrie],
+             workspaces: PrefixTrie) -> str | None:
+    """Root-relative path a TS/JS bare import points at, via the nearest
+    tsconfig/jsconfig path aliases, then workspace package names; None when
+    neither matches."""
+    parts = importer_dir.split("/") if importer_dir else []
+    for i in range(len(parts), -1, -1):
+        trie = aliases.get("/".join(parts[:i]))
+        if trie is None:
+            continue
+        hit = trie.longest(target)
+        if hit is not None:
+            n, prefix = hit
+            return posixpath.normpath(prefix + target[n:]).lstrip("/")
+        break  # the nearest config owns the file, as in tsc
+    hit = workspaces.longest(target) if workspaces else None
+    if hit is None:
+        return None
+    n, pkg_dir = hit
+    return posixpath.normpath(pkg_dir + target[n:])
+
+
+def _resolve_ts(target: str, importer_dir: str, aliases: dict[str, PrefixTrie],
+                workspaces: PrefixTrie) -> str | None:
+    """Module key of a TS/JS bare import (see `_ts_path`)."""
+    path = _ts_path(target, importer_dir, aliases, workspaces)
+    if path is None:
+        return None
+    return module_key(tuple(p for p in path.split("/") if p not in ("", ".")))
+
+
+def _resolve_bare(target: str, source_roots: set[str], reg: dict[str, str]) -> str | None:
+    """Map a non-relative import target to an internal module key, or None if
+    external."""
     # internal workspace package / crate by name (Rust `use crate::`, JS pkg)
     head = re.split(r"[/:\\]", target)[0]
     if head in reg:
@@ -345,16 +1593,199 @@ def _dedupe(seq):
     return out
 
 
+def _emit(record: dict) -> None:
+    """Write one NDJSON record and flush, so consumers see it immediately."""
+    sys.stdout.buffer.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+    sys.stdout.buffer.flush()
+
+
+def _write(result: dict, ndjson: bool, shape: dict | None = None) -> int:
+    """Print a finished skeleton as one JSON document, or as NDJSON records.
+    `shape` holds output.write's projection/encoding options for the document."""
+    out = sys.stdout.buffer
+    if not ndjson:
+        if shape:
+            import output
+            try:
+                output.write(result, out, **shape)
+            except KeyError as e:
+                sys.stderr.write(f"repo-map: --fields: no such field {e.args[0]!r}\n")
+                return 2
+            return 0
+        out.write((json.dumps(result, ensure_ascii=False, indent=2) + "\n").encode("utf-8"))
+        return 0
+    result = dict(result)
+    records = [{"type": "module", **m} for m in result.pop("modules")]
+    records += [{"type": "edge", **e} for e in result.pop("internal_edges")]
+    for record in records + [{"type": "summary", **result}]:
+        out.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+    return 0
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="repo-map deterministic scanner")
     ap.add_argument("--root", default=".")
     ap.add_argument("--json", action="store_true", help="(default) emit JSON")
+    ap.add_argument("--ndjson", action="store_true",
+                    help="stream one JSON record per line: modules as they finalize, "
+                         "then edges, then a summary")
     ap.add_argument("--max-files", type=int, default=5000)
+    ap.add_argument("--enumerate", choices=("auto", "git", "walk"), default="auto",
+                    help="file listing backend: git index (honors .gitignore) or "
+                         "filesystem walk with a .gitignore matcher (default: auto)")
+    ap.add_argument("--jobs", type=int, default=1, metavar="N",
+                    help="worker processes for import extraction (0 = one per CPU)")
+    ap.add_argument("--max-bytes", type=int, default=MAX_BYTES, metavar="N",
+                    help=f"skip source files larger than N bytes (0 = no cap; default {MAX_BYTES})")
+    ap.add_argument("--no-skip", action="store_true",
+                    help="disable the minified/generated/huge-file guard")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="neither read nor write the per-file scan cache")
+    ap.add_argument("--rebuild", action="store_true",
+                    help="discard the scan cache and re-parse every file")
+    ap.add_argument("--cache", metavar="PATH",
+                    help="cache file (default: $REPO_MAP_CACHE_DIR or ~/.cache/repo-map)")
+    ap.add_argument("--follow-symlinks", action="store_true",
+                    help="resolve relative imports through symlinks (default: lexical)")
+    ap.add_argument("--profile", action="store_true",
+                    help="add a `profile` section (resolver memo hit rate)")
+    ap.add_argument("--serve", action="store_true",
+                    help="run as a daemon: keep the skeleton in memory, poll for "
+                         "changes, answer requests on a local socket")
+    ap.add_argument("--client", nargs="?", const="scan", choices=("scan", "status", "stop"),
+                    help="ask a running daemon (default: scan); a scan falls back to "
+                         "a one-shot scan when no daemon answers")
+    ap.add_argument("--socket", metavar="PATH",
+                    help="daemon Unix socket (default: beside the scan cache)")
+    ap.add_argument("--port", type=int, metavar="N",
+                    help="use localhost TCP port N instead of a Unix socket")
+    ap.add_argument("--poll", type=float, default=2.0, metavar="SECONDS",
+                    help="daemon polling interval (default 2)")
+    ap.add_argument("--granularity", choices=("module", "file"), default="module",
+                    help="module map (default) or the file-level import graph with "
+                         "integer file ids and a compact edge list")
+    ap.add_argument("--workspace", metavar="BRAIN",
+                    help="scan every repo assigned to this engram brain, plus "
+                         "cross-repo edges")
+    ap.add_argument("--roots-from", metavar="FILE",
+                    help="like --workspace, for the roots listed in FILE (- = stdin)")
+    ap.add_argument("--rev", metavar="COMMIT",
+                    help="scan a commit from git objects (no checkout; works on bare repos)")
+    ap.add_argument("--diff", metavar="A..B",
+                    help="module/edge delta between two commits, read from git objects "
+                         "(B defaults to HEAD)")
+    ap.add_argument("--churn", type=int, metavar="DAYS",
+                    help="add a `churn` section: commits, lines changed and authors per "
+                         "module over the last DAYS days of git history")
+    ap.add_argument("--fields", metavar="A,B",
+                    help="print only these top-level fields (or sub-fields: graph.cycles)")
+    ap.add_argument("--compact", action="store_true",
+                    help="compact JSON (no indentation)")
+    ap.add_argument("--gzip", metavar="FILE",
+                    help="write the JSON gzipped to FILE instead of stdout")
+    ap.add_argument("--budget-bytes", type=int, default=0, metavar="N",
+                    help="keep the top-ranked modules (and the edges among them) that "
+                         "fit in N bytes of output; a `budget` section sums up the rest")
+    ap.add_argument("--fingerprint", action="store_true",
+                    help="only hash the structure (modules, manifests, entry points) "
+                         "from the listing and compare it with MAP.md's stamp")
+    ap.add_argument("--symbols", action="store_true",
+                    help="add a `symbols` index: top-level public functions, classes "
+                         "and exports per file")
     args = ap.parse_args()
     root = Path(os.path.abspath(args.root))
-    result = scan(root, args.max_files)
-    payload = json.dumps(result, ensure_ascii=False, indent=2)
-    sys.stdout.buffer.write((payload + "\n").encode("utf-8"))
+    guard = (max(0, args.max_bytes), not args.no_skip)
+    shape = {}
+    if args.fields or args.compact or args.gzip or args.budget_bytes > 0:
+        if args.ndjson or args.granularity == "file":
+            ap.error("--fields/--compact/--gzip/--budget-bytes shape the JSON document; "
+                     "they do not combine with --ndjson or --granularity file")
+        shape = {"fields": [f.strip() for f in (args.fields or "").split(",") if f.strip()],
+                 "compact": args.compact, "budget": max(0, args.budget_bytes),
+                 "gzip_path": args.gzip}
+    if args.diff or args.rev or args.churn:
+        import gitsource
+        GitError = gitsource.GitError
+    else:
+        GitError = ()  # nothing to catch
+    if args.diff:
+        a, _, b = args.diff.partition("..")
+        try:
+            return _write(gitsource.diff(root, a or "HEAD", b or "HEAD", guard), False, shape)
+        except GitError as e:
+            sys.stderr.write(f"repo-map: {e}\n")
+            return 2
+    if args.fingerprint:
+        return _write(fingerprint(root, args.max_files, args.enumerate), False, shape)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.workspace or args.roots_from:
+        import batch
+        try:
+            roots = (batch.workspace_roots(args.workspace) if args.workspace
+                     else batch.roots_from(args.roots_from))
+        except batch.BatchError as e:
+            sys.stderr.write(f"repo-map: {e}\n")
+            return 2
+        emit = _emit if args.ndjson else None
+        result = batch.scan_roots(roots, args.max_files, jobs, args.enumerate, guard,
+                                  cache=not args.no_cache, rebuild=args.rebuild, emit=emit)
+        if not emit:
+            return _write(result, False, shape)
+        for e in result.pop("cross_repo_edges"):
+            emit({"type": "cross_edge", **e})
+        emit({"type": "summary", **result})
+        return 0
+    if args.serve or args.client:
+        import daemon
+        address = args.port or args.socket or daemon.default_address(root)
+    if args.client:
+        reply = daemon.request(address, args.client)
+        if reply is not None:
+            return _write(reply, args.ndjson and args.client == "scan", shape)
+        if args.client != "scan":
+            _write({"running": False}, False)
+            return 1
+    cache = None
+    if not (args.no_cache or args.rev):
+        cache = ScanCache(Path(args.cache) if args.cache else cache_path(root),
+                          rebuild=args.rebuild, guard=guard)
+    resolver = RelativeResolver(root, follow_symlinks=args.follow_symlinks)
+    if args.granularity == "file":
+        import filegraph
+        result = filegraph.file_graph(root, args.max_files, cache, jobs, args.enumerate,
+                                      guard, resolver)
+        filegraph.write(result, sys.stdout.buffer, args.ndjson)
+        return 0
+    if args.serve:
+        live = daemon.LiveMap(root, args.max_files, args.enumerate, guard, resolver)
+        return daemon.serve(live, address, cache, jobs, max(0.1, args.poll))
+
+    def run(emit: Callable[[dict], None] | None = None) -> dict:
+        if args.rev:
+            result = gitsource.scan_rev(root, args.rev, args.max_files, emit, guard, resolver)
+        else:
+            result = scan(root, args.max_files, cache, jobs, args.enumerate, emit=emit,
+                          guard=guard, resolver=resolver, symbols=args.symbols)
+        if args.churn:
+            result["churn"] = gitsource.churn(root, args.churn, args.rev or "HEAD",
+                                              [m["path"] for m in result["modules"]])
+        if args.profile:
+            result["profile"] = {"resolve": resolver.report()}
+        return result
+
+    try:
+        if not args.ndjson:
+            return _write(run(), False, shape)
+        result = run(_emit)
+    except GitError as e:
+        sys.stderr.write(f"repo-map: {e}\n")
+        return 2
+    for e in result.pop("internal_edges"):
+        _emit({"type": "edge", **e})
+    for mod, files in result.pop("symbols", {}).items():
+        _emit({"type": "symbols", "path": mod, "files": files})
+    del result["modules"]
+    _emit({"type": "summary", **result})
     return 0
 
 